@@ -0,0 +1,221 @@
+import argparse
+import gc
+import multiprocessing
+import re
+import sys
+
+import degrees
+from degrees import (
+    load_data, movie_title, person_id_for_name, person_name, shortest_paths
+)
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description="Answer many degrees of separation queries at once."
+    )
+    parser.add_argument("directory", help="directory with the CSV data files")
+    parser.add_argument(
+        "pairs", nargs="?", default="-",
+        help="file with one tab separated 'source<TAB>target' name pair per line, "
+             "names may be followed by a birth year, e.g. 'Chris Evans (1981)' "
+             "(default: standard input)",
+    )
+    parser.add_argument(
+        "--snapshot", action="store_true",
+        help="load the data through a binary snapshot of the directory",
+    )
+    parser.add_argument(
+        "--streaming", action="store_true",
+        help="load only the columns needed for the search, "
+             "names and titles are read when printing the results",
+    )
+    parser.add_argument(
+        "--neighbor-cache", type=int, default=0, metavar="PAIRS",
+        help="cache neighbor sets of up to PAIRS (movie, person) pairs in total "
+             "(default: no cache)",
+    )
+    parser.add_argument(
+        "--workers", type=int, default=1,
+        help="number of worker processes; with more than one, results are "
+             "printed in input order (default: 1)",
+    )
+    args = parser.parse_args()
+
+    print("Loading data...", file=sys.stderr)
+    stats = load_data(args.directory, snapshot=args.snapshot, streaming=args.streaming)
+    print("Data loaded.", file=sys.stderr)
+    if stats is not None:
+        print(f"Read {stats['rows']} rows in {stats['seconds']:.2f}s "
+              f"({stats['rows_per_second']:.0f} rows/s).", file=sys.stderr)
+
+    if args.neighbor_cache:
+        degrees.enable_neighbor_cache(args.neighbor_cache)
+
+    if args.pairs == "-":
+        queries = read_queries(sys.stdin)
+    else:
+        with open(args.pairs, encoding="utf-8") as f:
+            queries = read_queries(f)
+
+    if args.workers > 1:
+        results = run_queries_parallel(
+            queries, args.workers, args.directory, args.snapshot, args.streaming
+        )
+    else:
+        results = run_queries(queries)
+
+    for line in results:
+        print(line, flush=True)
+
+    # With worker processes, each of them has its own cache and counters.
+    if degrees.neighbor_cache is not None and args.workers == 1:
+        print(f"Neighbor cache: {degrees.neighbor_cache.stats()}", file=sys.stderr)
+
+
+def read_queries(f):
+    """
+    Reads (source name, target name) pairs, one tab separated pair per line.
+    """
+    queries = []
+    for line in f:
+        line = line.rstrip("\n")
+        if not line.strip():
+            continue
+        source, _, target = line.partition("\t")
+        queries.append((source.strip(), target.strip()))
+    return queries
+
+
+def run_queries(queries):
+    """
+    Answers the queries, yielding one tab separated result line per query:
+    the query index, both names, the number of degrees and the path.
+
+    Queries are grouped by their source, so that one BFS tree answers every
+    query from the same person. Results are therefore yielded grouped by source;
+    the query index identifies the input line each of them belongs to.
+    """
+    groups, failures = group_queries(queries)
+    for index, line in failures:
+        yield line
+    for group in groups.items():
+        for index, line in answer_group(group):
+            yield line
+
+
+def run_queries_parallel(queries, workers, directory, snapshot=False, streaming=False):
+    """
+    Answers the queries like run_queries, but spreads the source groups over
+    a pool of worker processes. Results are yielded in input order.
+
+    Where fork is available the workers share the already loaded data
+    copy-on-write; otherwise each worker loads the data itself.
+    """
+    groups, failures = group_queries(queries)
+
+    fork = "fork" in multiprocessing.get_all_start_methods()
+    if fork:
+        context = multiprocessing.get_context("fork")
+        initializer, initargs = None, ()
+        # Index the side tables once here, instead of in every worker.
+        degrees.load_details()
+        # Keep the garbage collector from touching (and thereby copying)
+        # the pages of the loaded data in every worker.
+        gc.freeze()
+    else:
+        context = multiprocessing.get_context()
+        initializer, initargs = load_data, (directory, snapshot, streaming)
+
+    # Results arrive in any order, hold them back until all earlier ones are ready.
+    pending = dict(failures)
+    next_index = 0
+    try:
+        with context.Pool(workers, initializer, initargs) as pool:
+            for results in pool.imap_unordered(answer_group, groups.items()):
+                pending.update(results)
+                while next_index in pending:
+                    yield pending.pop(next_index)
+                    next_index += 1
+    finally:
+        # The parent's objects go back under the collector's control.
+        if fork:
+            gc.unfreeze()
+
+    while next_index in pending:
+        yield pending.pop(next_index)
+        next_index += 1
+
+
+def group_queries(queries):
+    """
+    Resolves the names of the queries and groups them by source. Returns a dict
+    mapping source ids to lists of (index, source name, target name, target id)
+    and a list of (index, result line) pairs for queries with unknown names.
+    """
+    groups = {}
+    failures = []
+    for index, (source_name, target_name) in enumerate(queries):
+        source = resolve(source_name)
+        target = resolve(target_name)
+        if source is None or target is None:
+            failures.append((index, format_result(
+                index, source_name, target_name, "person not found"
+            )))
+            continue
+        groups.setdefault(source, []).append((index, source_name, target_name, target))
+
+    return groups, failures
+
+
+def answer_group(group):
+    """
+    Answers all queries of one (source, queries) group with a single BFS tree.
+    Returns a list of (index, result line) pairs.
+    """
+    source, queries = group
+    paths = shortest_paths(source, [target for *_, target in queries])
+
+    results = []
+    for index, source_name, target_name, target in queries:
+        path = paths[target]
+        if path is None:
+            line = format_result(index, source_name, target_name, "not connected")
+        else:
+            line = format_result(
+                index, source_name, target_name, len(path), format_path(source, path)
+            )
+        results.append((index, line))
+    return results
+
+
+def resolve(name):
+    """
+    Returns the IMDB id for a person's name, or None if the name is unknown or
+    ambiguous (batch queries cannot ask which person was meant). Ambiguous names
+    can be qualified with a birth year, e.g. 'Chris Evans (1981)'.
+    """
+    birth = None
+    match = re.fullmatch(r"(.*?)\s*\((\d{4})\)", name)
+    if match:
+        name, birth = match.groups()
+    return person_id_for_name(name, birth, interactive=False)
+
+
+def format_path(source, path):
+    """
+    Formats a path as 'Person > Movie > Person > ...'.
+    """
+    parts = [person_name(source)]
+    for movie_id, person_id in path:
+        parts.append(movie_title(movie_id))
+        parts.append(person_name(person_id))
+    return " > ".join(parts)
+
+
+def format_result(*fields):
+    return "\t".join(str(field) for field in fields)
+
+
+if __name__ == "__main__":
+    main()
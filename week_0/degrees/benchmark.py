@@ -0,0 +1,267 @@
+import argparse
+import csv
+import json
+import random
+import sys
+import tempfile
+import time
+import tracemalloc
+
+import degrees
+import graph
+
+# Chance that a cast member is picked proportionally to the number of movies
+# they already starred in (preferential attachment), giving a power-law degree
+# distribution with a few hub actors, like in the real IMDb data.
+PREFERENTIAL = 0.8
+
+# Movies per person in the generated data, and the largest cast size.
+MOVIES_PER_PERSON = 0.5
+MAX_CAST = 12
+
+# Each timing is repeated and the lowest value is kept, as noise (other
+# processes, caches, the garbage collector) only ever makes a run slower.
+REPEAT = 5
+
+# Differences smaller than these are noise and never reported as regressions:
+# seconds for loads, seconds for (average) queries, and bytes.
+LOAD_NOISE_FLOOR = 0.05
+QUERY_NOISE_FLOOR = 0.001
+MEMORY_NOISE_FLOOR = 2 ** 20
+
+# Allowed slowdown against a baseline. Even the best of the rounds varies by
+# about 10% between runs of the same code, and more on shared machines.
+TOLERANCE = 0.25
+
+# The timed loaders, by metric prefix ("load" is the default load_data).
+LOADERS = {
+    "load": lambda directory: degrees.load_data(directory),
+    "streaming_load": lambda directory: degrees.load_data(directory, streaming=True),
+    "snapshot_load": lambda directory: degrees.load_data(directory, snapshot=True),
+    "graph_load": lambda directory: graph.load_graph(directory),
+}
+
+# The searches timed after a loader, as (metric prefix, bidirectional) pairs.
+SEARCHES = {
+    "load": (("solve", False), ("bidirectional", True)),
+    "snapshot_load": (("snapshot_solve", False),),
+}
+
+
+def generate(directory, people_count, seed=0):
+    """
+    Writes synthetic people.csv, movies.csv and stars.csv files with
+    people_count people into the directory.
+    """
+    rng = random.Random(seed)
+    movie_count = max(1, int(people_count * MOVIES_PER_PERSON))
+
+    with open(f"{directory}/people.csv", "w", encoding="utf-8", newline="") as f:
+        writer = csv.writer(f)
+        writer.writerow(["id", "name", "birth"])
+        for i in range(people_count):
+            writer.writerow([i, f"Person {i}", rng.randint(1920, 2005)])
+
+    with open(f"{directory}/movies.csv", "w", encoding="utf-8", newline="") as f:
+        writer = csv.writer(f)
+        writer.writerow(["id", "title", "year"])
+        for i in range(movie_count):
+            writer.writerow([i, f"Movie {i}", rng.randint(1930, 2022)])
+
+    # Every appearance is recorded, so that a uniform pick from the appearances
+    # picks a person proportionally to the number of their movies.
+    appearances = []
+    with open(f"{directory}/stars.csv", "w", encoding="utf-8", newline="") as f:
+        writer = csv.writer(f)
+        writer.writerow(["person_id", "movie_id"])
+        for movie in range(movie_count):
+            cast = set()
+            for _ in range(rng.randint(2, MAX_CAST)):
+                if appearances and rng.random() < PREFERENTIAL:
+                    cast.add(rng.choice(appearances))
+                else:
+                    cast.add(rng.randrange(people_count))
+            for person in cast:
+                writer.writerow([person, movie])
+                appearances.append(person)
+
+
+def reset():
+    """
+    Forgets the data loaded into the degrees module.
+    """
+    degrees.names.clear()
+    degrees.people.clear()
+    degrees.movies.clear()
+    degrees.graph = None
+
+
+def timed(function, *args):
+    """
+    Returns the time function(*args) takes, in seconds.
+    """
+    start = time.perf_counter()
+    function(*args)
+    return time.perf_counter() - start
+
+
+def keep_best(results, metric, value):
+    results[metric] = min(value, results.get(metric, value))
+
+
+def peak_memory(function):
+    """
+    Returns the peak of the memory traced while running function(), in bytes.
+    """
+    tracemalloc.start()
+    try:
+        function()
+        return tracemalloc.get_traced_memory()[1]
+    finally:
+        tracemalloc.stop()
+
+
+def measure(directory, queries, seed=0, repeat=REPEAT):
+    """
+    Times each loader (see LOADERS) and queries random shortest_path searches
+    (with the BFS and the bidirectional search on the default load, and the BFS
+    on the snapshot) on a generated directory. Returns the results.
+
+    All timings are taken once in each of repeat rounds, and the best of each
+    is kept, so that a slow phase of the machine does not skew single metrics.
+    """
+    # Write the snapshot, so that the snapshot loader is timed on a warm start.
+    reset()
+    degrees.load_data(directory, snapshot=True)
+
+    # Only people with movies, as isolated people would make queries trivial.
+    reset()
+    degrees.load_data(directory)
+    rng = random.Random(seed)
+    person_ids = [
+        person_id for person_id, person in degrees.people.items() if person["movies"]
+    ]
+    pairs = [(rng.choice(person_ids), rng.choice(person_ids)) for _ in range(queries)]
+
+    def search(bidirectional):
+        for source, target in pairs:
+            degrees.shortest_path(source, target, bidirectional=bidirectional)
+
+    results = {}
+    for _ in range(repeat):
+        for name, loader in LOADERS.items():
+            reset()
+            keep_best(results, f"{name}_seconds", timed(loader, directory))
+
+            # Search the data that was just loaded.
+            for search_name, bidirectional in SEARCHES.get(name, ()):
+                seconds = timed(search, bidirectional) / queries
+                keep_best(results, f"{search_name}_seconds", seconds)
+
+    # Memory is measured in a separate pass, as tracing slows everything down.
+    def load_and_search():
+        degrees.load_data(directory)
+        for source, target in pairs[:10]:
+            degrees.shortest_path(source, target)
+
+    reset()
+    results["peak_bytes"] = peak_memory(load_and_search)
+    for name, loader in LOADERS.items():
+        if name != "load":
+            reset()
+            results[f"{name}_peak_bytes"] = peak_memory(lambda: loader(directory))
+    reset()
+
+    return results
+
+
+def noise_floor(metric):
+    """
+    Returns the smallest difference of the metric that is not noise.
+    """
+    if metric.endswith("_bytes"):
+        return MEMORY_NOISE_FLOOR
+    if "load" in metric:
+        return LOAD_NOISE_FLOOR
+    return QUERY_NOISE_FLOOR
+
+
+def compare(results, baseline, tolerance):
+    """
+    Returns a list of regressions: measurements more than tolerance (a fraction)
+    and more than the noise floor of the metric worse than in the baseline,
+    as (size, metric, baseline, current) tuples.
+    """
+    regressions = []
+    for size, measurements in results.items():
+        for metric, value in measurements.items():
+            previous = baseline.get(size, {}).get(metric)
+            if (previous and value > previous * (1 + tolerance)
+                    and value - previous > noise_floor(metric)):
+                regressions.append((size, metric, previous, value))
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description="Benchmark degrees on synthetic scale-free actor graphs."
+    )
+    parser.add_argument(
+        "--sizes", type=int, nargs="+", default=[1000, 10000, 100000],
+        help="numbers of people to generate (default: 1000 10000 100000)",
+    )
+    parser.add_argument(
+        "--queries", type=int, default=100,
+        help="number of random queries per size (default: 100)",
+    )
+    parser.add_argument(
+        "--repeat", type=int, default=REPEAT,
+        help=f"rounds of timings, the best of each counts (default: {REPEAT})",
+    )
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--baseline", help="JSON results to compare against")
+    parser.add_argument("--save", help="write the results as JSON into this file")
+    parser.add_argument(
+        "--tolerance", type=float, default=TOLERANCE,
+        help=f"allowed slowdown against the baseline, as a fraction (default: {TOLERANCE})",
+    )
+    args = parser.parse_args()
+
+    results = {}
+    for size in args.sizes:
+        with tempfile.TemporaryDirectory() as directory:
+            generate(directory, size, args.seed)
+            results[str(size)] = measure(directory, args.queries, args.seed, args.repeat)
+
+        r = results[str(size)]
+        print(
+            f"{size} people: load {r['load_seconds']:.3f}s, "
+            f"solve {r['solve_seconds'] * 1000:.2f}ms, "
+            f"bidirectional {r['bidirectional_seconds'] * 1000:.2f}ms, "
+            f"peak {r['peak_bytes'] / 2 ** 20:.1f}MiB"
+        )
+        for name in LOADERS:
+            if name != "load":
+                print(
+                    f"    {name.replace('_', ' ')} {r[f'{name}_seconds']:.3f}s, "
+                    f"peak {r[f'{name}_peak_bytes'] / 2 ** 20:.1f}MiB"
+                )
+        print(f"    snapshot solve {r['snapshot_solve_seconds'] * 1000:.2f}ms")
+
+    if args.save:
+        with open(args.save, "w") as f:
+            json.dump(results, f, indent=4)
+
+    if args.baseline:
+        with open(args.baseline) as f:
+            baseline = json.load(f)
+        regressions = compare(results, baseline, args.tolerance)
+        for size, metric, previous, value in regressions:
+            print(f"Regression: {size} people, {metric} {previous:.4g} -> {value:.4g}")
+        if regressions:
+            sys.exit(1)
+        print("No regressions.")
+
+
+if __name__ == "__main__":
+    main()
@@ -1,7 +1,9 @@
 import csv
 import sys
+import time
 
-from util import Node, StackFrontier, QueueFrontier
+from graph import load_graph
+from util import LRUCache, NameIndex, Node, SideTable, StackFrontier, QueueFrontier
 
 # Maps names to a set of corresponding person_ids
 names = {}
@@ -12,10 +14,55 @@ people = {}
 # Maps movie_ids to a dictionary of: title, year, stars (a set of person_ids)
 movies = {}
 
+# Compact graph the data is served from when loaded with snapshot=True,
+# in which case names, people and movies stay empty
+graph = None
 
-def load_data(directory):
+# Output-only columns (name, birth, title, year) when loaded with streaming=True
+person_details = None
+movie_details = None
+
+# Prefix and fuzzy index over the keys of names, built by load_data
+name_index = None
+
+# Optional LRU cache of neighbors_for_person results, see enable_neighbor_cache
+neighbor_cache = None
+
+
+def load_data(directory, snapshot=False, streaming=False):
     """
     Load data from CSV files into memory.
+
+    If snapshot is True, the data is read from a binary snapshot of the
+    directory instead (see graph.load_graph), which is created on first use.
+    The searches and lookups then use the memory-mapped graph directly.
+
+    If streaming is True, only the columns needed for name lookups and path
+    search are loaded (see load_connectivity), and the loading statistics are returned.
+    """
+    # Cached neighbors may not be valid for the newly loaded data.
+    if neighbor_cache is not None:
+        neighbor_cache.clear()
+
+    global graph, person_details, movie_details
+    graph = None
+    person_details = movie_details = None
+
+    stats = None
+    if snapshot:
+        load_snapshot(directory)
+    elif streaming:
+        stats = load_connectivity(directory)
+    else:
+        load_csv(directory)
+
+    build_name_index()
+    return stats
+
+
+def load_csv(directory):
+    """
+    Load all columns of the CSV files into memory.
     """
     # Load people
     with open(f"{directory}/people.csv", encoding="utf-8") as f:
@@ -52,14 +99,124 @@ def load_data(directory):
                 pass
 
 
+def load_connectivity(directory):
+    """
+    Load only the ids, the name index and the stars of the CSV files into memory.
+    The people and movies entries get no name, birth, title or year; those are
+    read from side tables on first use by person_name, person_birth and movie_title.
+
+    Returns a dictionary with the number of rows read, the time taken and the rows per second.
+    """
+    global person_details, movie_details
+    start = time.perf_counter()
+    rows = 0
+
+    # Load people ids and the name index
+    with open(f"{directory}/people.csv", encoding="utf-8") as f:
+        reader = csv.reader(f)
+        header = next(reader)
+        id_index, name_index = header.index("id"), header.index("name")
+        for row in reader:
+            person_id = row[id_index]
+            people[person_id] = {"movies": set()}
+            names.setdefault(row[name_index].lower(), set()).add(person_id)
+            rows += 1
+
+    # Load movie ids
+    with open(f"{directory}/movies.csv", encoding="utf-8") as f:
+        reader = csv.reader(f)
+        id_index = next(reader).index("id")
+        for row in reader:
+            movies[row[id_index]] = {"stars": set()}
+            rows += 1
+
+    # Load stars
+    with open(f"{directory}/stars.csv", encoding="utf-8") as f:
+        reader = csv.reader(f)
+        header = next(reader)
+        person_index, movie_index = header.index("person_id"), header.index("movie_id")
+        for row in reader:
+            person_id, movie_id = row[person_index], row[movie_index]
+            try:
+                people[person_id]["movies"].add(movie_id)
+                movies[movie_id]["stars"].add(person_id)
+            except KeyError:
+                pass
+            rows += 1
+
+    person_details = SideTable(f"{directory}/people.csv", "id", ["name", "birth"])
+    movie_details = SideTable(f"{directory}/movies.csv", "id", ["title", "year"])
+
+    seconds = time.perf_counter() - start
+    return {
+        "rows": rows,
+        "seconds": seconds,
+        "rows_per_second": rows / seconds if seconds else float("inf"),
+    }
+
+
+def person_name(person_id):
+    """
+    Returns the name of a person, also when it was not loaded into memory.
+    """
+    if graph is not None:
+        return graph.person_name(person_id)
+    person = people[person_id]
+    if "name" in person:
+        return person["name"]
+    return person_details.get(person_id, "name")
+
+
+def person_birth(person_id):
+    if graph is not None:
+        return graph.person_birth(person_id)
+    person = people[person_id]
+    if "birth" in person:
+        return person["birth"]
+    return person_details.get(person_id, "birth")
+
+
+def movie_title(movie_id):
+    """
+    Returns the title of a movie, also when it was not loaded into memory.
+    """
+    if graph is not None:
+        return graph.movie_title(movie_id)
+    movie = movies[movie_id]
+    if "title" in movie:
+        return movie["title"]
+    return movie_details.get(movie_id, "title")
+
+
+def load_details():
+    """
+    Indexes the side tables of a streaming load now rather than on first use,
+    e.g. before forking worker processes, so that they share one index.
+    """
+    for details in (person_details, movie_details):
+        if details is not None and details.hashes is None:
+            details.load()
+
+
+def load_snapshot(directory):
+    """
+    Load data from the binary snapshot of a directory. The graph (adjacency,
+    strings and lookup indices) stays memory-mapped, rather than being copied
+    into people and movies.
+    """
+    global graph
+    graph = load_graph(directory, snapshot=True)
+
+
 def main():
     if len(sys.argv) > 2:
         sys.exit("Usage: python degrees.py [directory]")
     directory = sys.argv[1] if len(sys.argv) == 2 else "large"
 
-    # Load data from files into memory
+    # Load data from files into memory, through the binary snapshot of the
+    # directory, so that only the first run parses the CSV files.
     print("Loading data...")
-    load_data(directory)
+    load_data(directory, snapshot=True)
     print("Data loaded.")
 
     source = person_id_for_name(input("Name: "))
@@ -78,17 +235,20 @@ def main():
         print(f"{degrees} degrees of separation.")
         path = [(None, source)] + path
         for i in range(degrees):
-            person1 = people[path[i][1]]["name"]
-            person2 = people[path[i + 1][1]]["name"]
-            movie = movies[path[i + 1][0]]["title"]
+            person1 = person_name(path[i][1])
+            person2 = person_name(path[i + 1][1])
+            movie = movie_title(path[i + 1][0])
             print(f"{i + 1}: {person1} and {person2} starred in {movie}")
 
 
-def shortest_path(source, target):
+def shortest_path(source, target, bidirectional=False):
     """
     Returns the shortest list of (movie_id, person_id) pairs
     that connect the source to the target.
 
+    If bidirectional is True, the search grows from both the source and
+    the target and stops when the two frontiers meet.
+
     If no possible path, returns None.
     """
 
@@ -96,6 +256,12 @@ def shortest_path(source, target):
     if source == target:
         return []
 
+    if bidirectional:
+        return solve_bidirectional(source, target)
+
+    if graph is not None:
+        return graph.shortest_path(source, target)
+
     node = solve(source, target)
     if node:
         # A solution exists, format it into a list of tuples (movie_id, person_id)
@@ -161,20 +327,157 @@ def solve(source, target):
     return node
 
 
-def person_id_for_name(name):
+def solve_bidirectional(source, target):
+    """
+    Solve the shortest path problem between the source and target,
+    by running a BFS from both ends until the two searches meet.
+
+    Returns the list of (movie_id, person_id) pairs, or None if there is no path.
+    """
+
+    # For every reached person store the (movie_id, person_id) pair that leads back
+    # towards the root of that search (the source or the target, respectively).
+    forward = {source: None}
+    backward = {target: None}
+    forward_layer = [source]
+    backward_layer = [target]
+
+    meeting = None
+    while forward_layer and backward_layer and meeting is None:
+
+        # Always expand the smaller of the two layers, as it is the cheaper one.
+        if len(forward_layer) <= len(backward_layer):
+            forward_layer, meeting = expand_layer(forward_layer, forward, backward)
+        else:
+            backward_layer, meeting = expand_layer(backward_layer, backward, forward)
+
+    # If one of the layers ran empty, there is no path between the two people.
+    if meeting is None:
+        return None
+
+    # Walk from the meeting point back to the source, then forward to the target.
+    solution = []
+    person_id = meeting
+    while forward[person_id] is not None:
+        movie_id, parent = forward[person_id]
+        solution.append((movie_id, person_id))
+        person_id = parent
+    solution.reverse()
+
+    person_id = meeting
+    while backward[person_id] is not None:
+        movie_id, person_id = backward[person_id]
+        solution.append((movie_id, person_id))
+
+    return solution
+
+
+def expand_layer(layer, parents, other_parents):
+    """
+    Expands one BFS layer of a bidirectional search, recording the parents of
+    newly reached people. Returns the next layer and the person where the search
+    met the other one (or None, if the searches have not met yet).
+    """
+    next_layer = []
+    for person_id in layer:
+        for movie_id, neighbor_id in neighbors_for_person(person_id):
+            if neighbor_id in parents:
+                continue
+            parents[neighbor_id] = (movie_id, person_id)
+
+            # The first person reached by both searches lies on a shortest path.
+            if neighbor_id in other_parents:
+                return next_layer, neighbor_id
+
+            next_layer.append(neighbor_id)
+
+    return next_layer, None
+
+
+def shortest_paths(source, targets):
+    """
+    Returns a dict mapping each of the targets to the shortest list of
+    (movie_id, person_id) pairs that connect the source to it (None if not connected).
+
+    A single BFS tree from the source answers all of the targets.
+    """
+    remaining = set(targets)
+    remaining.discard(source)
+
+    # For every reached person store the (movie_id, person_id) pair it was reached from.
+    parents = {source: None}
+    layer = [source]
+
+    # Stop growing the tree as soon as every target has been reached.
+    while layer and remaining:
+        next_layer = []
+        for person_id in layer:
+            for movie_id, neighbor_id in neighbors_for_person(person_id):
+                if neighbor_id in parents:
+                    continue
+                parents[neighbor_id] = (movie_id, person_id)
+                remaining.discard(neighbor_id)
+                next_layer.append(neighbor_id)
+
+            if not remaining:
+                break
+        layer = next_layer
+
+    paths = {}
+    for target in targets:
+        if target not in parents:
+            paths[target] = None
+            continue
+
+        solution = []
+        person_id = target
+        while parents[person_id] is not None:
+            movie_id, parent = parents[person_id]
+            solution.append((movie_id, person_id))
+            person_id = parent
+        solution.reverse()
+        paths[target] = solution
+
+    return paths
+
+
+def build_name_index():
+    global name_index
+    name_index = NameIndex(graph.lower_names() if graph is not None else names)
+
+
+def person_ids_for_key(key):
+    """
+    Returns the set of person_ids with the given lowercase name.
+    """
+    if graph is not None:
+        return {graph.person_ids[index] for index in graph.person_indices_for_name(key)}
+    return names.get(key, set())
+
+
+def person_id_for_name(name, birth=None, interactive=True):
     """
     Returns the IMDB id for a person's name,
     resolving ambiguities as needed.
+
+    If birth is given, only people born in that year are considered.
+    If interactive is False, ambiguous names return None instead of asking.
     """
-    person_ids = list(names.get(name.lower(), set()))
+    person_ids = list(person_ids_for_key(name.lower()))
+    if birth is not None:
+        person_ids = [
+            person_id for person_id in person_ids
+            if person_birth(person_id) == str(birth)
+        ]
     if len(person_ids) == 0:
         return None
     elif len(person_ids) > 1:
+        if not interactive:
+            return None
         print(f"Which '{name}'?")
         for person_id in person_ids:
-            person = people[person_id]
-            name = person["name"]
-            birth = person["birth"]
+            name = person_name(person_id)
+            birth = person_birth(person_id)
             print(f"ID: {person_id}, Name: {name}, Birth: {birth}")
         try:
             person_id = input("Intended Person ID: ")
@@ -187,16 +490,70 @@ def person_id_for_name(name):
         return person_ids[0]
 
 
+def complete_names(prefix, limit=10):
+    """
+    Returns up to limit (name, person_ids) pairs for names starting with the prefix.
+    """
+    return [
+        (person_name(next(iter(person_ids))), person_ids)
+        for person_ids in map(person_ids_for_key, name_index.complete(prefix, limit))
+    ]
+
+
+def similar_names(name, limit=5):
+    """
+    Returns up to limit (name, person_ids) pairs for names similar to the given
+    one, best matches first, e.g. to correct typos.
+    """
+    return [
+        (person_name(next(iter(person_ids))), person_ids)
+        for person_ids in map(person_ids_for_key, name_index.similar(name, limit))
+    ]
+
+
+def enable_neighbor_cache(max_pairs):
+    """
+    Caches the results of neighbors_for_person, keeping at most max_pairs
+    (movie_id, person_id) pairs in total and evicting the least recently used
+    people first. Returns the cache, whose stats() reports hits and misses.
+    """
+    global neighbor_cache
+    neighbor_cache = LRUCache(max_pairs)
+    return neighbor_cache
+
+
+def disable_neighbor_cache():
+    global neighbor_cache
+    neighbor_cache = None
+
+
 def neighbors_for_person(person_id):
     """
     Returns (movie_id, person_id) pairs for people
     who starred with a given person.
+
+    If the neighbor cache is enabled, the (shared) result is a frozenset.
     """
+    if neighbor_cache is not None:
+        return neighbor_cache.get(person_id, compute_neighbors)
+    return compute_neighbors(person_id)
+
+
+def compute_neighbors(person_id):
+    """
+    Builds the set of (movie_id, person_id) neighbor pairs of a person.
+    """
+    if graph is not None:
+        neighbors = graph.neighbors_for_person(person_id)
+        return frozenset(neighbors) if neighbor_cache is not None else neighbors
+
     movie_ids = people[person_id]["movies"]
     neighbors = set()
     for movie_id in movie_ids:
         for person_id in movies[movie_id]["stars"]:
             neighbors.add((movie_id, person_id))
+    if neighbor_cache is not None:
+        return frozenset(neighbors)
     return neighbors
 
 
@@ -0,0 +1,522 @@
+import csv
+import mmap
+import os
+import struct
+import sys
+from array import array
+from bisect import bisect_left, bisect_right
+
+# Binary snapshot of a loaded graph, stored next to the CSV files.
+SNAPSHOT_FILE = ".graph.snapshot"
+SNAPSHOT_VERSION = 2
+SNAPSHOT_MAGIC = b"DEGSNAP" + (b"L" if sys.byteorder == "little" else b"B")
+
+# Magic, version, (mtime_ns, size) of the three CSV files, number of people,
+# movies and star rows, and the byte lengths of the six string tables' data.
+SNAPSHOT_HEADER = struct.Struct("<8sI6q3q6q")
+SOURCE_FILES = ("people.csv", "movies.csv", "stars.csv")
+
+
+class StringTable():
+    """
+    List of strings stored as one UTF-8 buffer and an array of the offsets of
+    the strings in it, rather than as one str object per string.
+    The buffer may also be a memoryview of a snapshot.
+    """
+
+    def __init__(self, data=None, offsets=None):
+        self.data = bytearray() if data is None else data
+        self.offsets = array("i", [0]) if offsets is None else offsets
+
+    def __len__(self):
+        return len(self.offsets) - 1
+
+    def __getitem__(self, index):
+        return str(self.data[self.offsets[index]:self.offsets[index + 1]], "utf-8")
+
+    def __iter__(self):
+        for index in range(len(self)):
+            yield self[index]
+
+    def append(self, string):
+        self.data += string.encode("utf-8")
+        self.offsets.append(len(self.data))
+
+
+class Graph():
+    """
+    Compact actor/movie graph. People and movies are interned to dense integer
+    indices and the adjacency (person -> movies, movie -> stars) is stored in
+    CSR form: for person p, its movies are person_movies[person_offsets[p]:person_offsets[p + 1]].
+
+    There are no per-person or per-movie objects: the strings are kept in
+    StringTables, and IMDb ids and names are looked up by binary search over
+    arrays of the indices sorted by them (see build_indices).
+    """
+
+    def __init__(self):
+        # Index -> IMDb id, for people and movies.
+        self.person_ids = StringTable()
+        self.movie_ids = StringTable()
+
+        # Per-index attributes, used only for lookups and output.
+        self.person_names = StringTable()
+        self.person_births = StringTable()
+        self.movie_titles = StringTable()
+        self.movie_years = StringTable()
+
+        # Indices sorted by IMDb id, and person indices sorted by lowercase name.
+        self.person_order = array("i")
+        self.movie_order = array("i")
+        self.name_order = array("i")
+
+        # CSR adjacency arrays.
+        self.person_offsets = array("i", [0])
+        self.person_movies = array("i")
+        self.movie_offsets = array("i", [0])
+        self.movie_stars = array("i")
+
+    def add_person(self, person_id, name, birth):
+        index = len(self.person_ids)
+        self.person_ids.append(person_id)
+        self.person_names.append(name)
+        self.person_births.append(birth)
+        return index
+
+    def add_movie(self, movie_id, title, year):
+        index = len(self.movie_ids)
+        self.movie_ids.append(movie_id)
+        self.movie_titles.append(title)
+        self.movie_years.append(year)
+        return index
+
+    def build_indices(self):
+        """
+        Sorts the indices by IMDb id and by lowercase name, once all people and
+        movies were added.
+        """
+        self.person_order = sorted_indices(self.person_ids)
+        self.movie_order = sorted_indices(self.movie_ids)
+        self.name_order = sorted_indices(self.person_names, str.lower)
+
+    def set_stars(self, star_people, star_movies):
+        """
+        Builds the CSR adjacency from two parallel arrays of (person, movie) indices.
+        """
+        self.person_offsets, self.person_movies = build_csr(
+            star_people, star_movies, len(self.person_ids)
+        )
+        self.movie_offsets, self.movie_stars = build_csr(
+            star_movies, star_people, len(self.movie_ids)
+        )
+
+    def movies_of(self, person):
+        """Returns the indices of the movies a person (index) starred in."""
+        return self.person_movies[self.person_offsets[person]:self.person_offsets[person + 1]]
+
+    def stars_of(self, movie):
+        """Returns the indices of the people that starred in a movie (index)."""
+        return self.movie_stars[self.movie_offsets[movie]:self.movie_offsets[movie + 1]]
+
+    def person_index(self, person_id):
+        """Returns the index of a person (IMDb id), raises KeyError if unknown."""
+        return find(self.person_order, self.person_ids, person_id)
+
+    def movie_index(self, movie_id):
+        """Returns the index of a movie (IMDb id), raises KeyError if unknown."""
+        return find(self.movie_order, self.movie_ids, movie_id)
+
+    def person_indices_for_name(self, name):
+        """Returns the indices of all people with the given name (in any case)."""
+        names = self.person_names
+        return equal_range(self.name_order, name.lower(), lambda index: names[index].lower())
+
+    def person_ids_for_name(self, name):
+        """Returns the IMDb ids of all people with the given name."""
+        return [self.person_ids[index] for index in self.person_indices_for_name(name)]
+
+    def lower_names(self):
+        """Yields the distinct lowercase names, in sorted order."""
+        previous = None
+        for index in self.name_order:
+            name = self.person_names[index].lower()
+            if name != previous:
+                yield name
+                previous = name
+
+    def person_name(self, person_id):
+        return self.person_names[self.person_index(person_id)]
+
+    def person_birth(self, person_id):
+        return self.person_births[self.person_index(person_id)]
+
+    def movie_title(self, movie_id):
+        return self.movie_titles[self.movie_index(movie_id)]
+
+    def neighbors_for_person(self, person_id):
+        """
+        Returns (movie_id, person_id) pairs for people
+        who starred with a given person.
+        """
+        neighbors = set()
+        for movie in self.movies_of(self.person_index(person_id)):
+            movie_id = self.movie_ids[movie]
+            for star in self.stars_of(movie):
+                neighbors.add((movie_id, self.person_ids[star]))
+        return neighbors
+
+    def shortest_path(self, source, target):
+        """
+        Returns the shortest list of (movie_id, person_id) pairs
+        that connect the source to the target (both IMDb ids).
+
+        If no possible path, returns None.
+        """
+        if source == target:
+            return []
+
+        path = self.solve(self.person_index(source), self.person_index(target))
+        if path is None:
+            return None
+        return [(self.movie_ids[movie], self.person_ids[person]) for movie, person in path]
+
+    def solve(self, source, target):
+        """
+        BFS between two person indices. Returns a list of (movie, person) index
+        pairs, or None if the two people are not connected.
+        """
+        # parent[p] is the person p was reached from (-1 if not reached yet),
+        # via[p] is the movie connecting them.
+        parent = array("i", [-1]) * len(self.person_ids)
+        via = array("i", [-1]) * len(self.person_ids)
+        parent[source] = source
+
+        # Once a movie was expanded all of its stars have been reached,
+        # so there is no need to expand it again from another co-star.
+        expanded_movies = bytearray(len(self.movie_ids))
+
+        layer = [source]
+        while layer:
+            next_layer = []
+            for person in layer:
+                for movie in self.movies_of(person):
+                    if expanded_movies[movie]:
+                        continue
+                    expanded_movies[movie] = 1
+
+                    for star in self.stars_of(movie):
+                        if parent[star] != -1:
+                            continue
+                        parent[star] = person
+                        via[star] = movie
+
+                        if star == target:
+                            return backtrack(parent, via, source, target)
+
+                        next_layer.append(star)
+            layer = next_layer
+
+        return None
+
+
+def sorted_indices(table, key=None):
+    """
+    Returns an array of the indices of a StringTable, sorted by their strings
+    (or by key of them). Ties keep the order of the indices.
+    """
+    if key is None:
+        sort_key = table.__getitem__
+    else:
+        def sort_key(index):
+            return key(table[index])
+    return array("i", sorted(range(len(table)), key=sort_key))
+
+
+def equal_range(order, value, key):
+    """
+    Returns the run of the indices in order (sorted by key) whose key is value.
+    """
+    start = bisect_left(order, value, key=key)
+    return order[start:bisect_right(order, value, lo=start, key=key)]
+
+
+def find(order, table, value):
+    """
+    Returns the first index of the string value in a StringTable, given the
+    indices of the table sorted by string. Raises KeyError if it is not there.
+    """
+    position = bisect_left(order, value, key=table.__getitem__)
+    if position == len(order) or table[order[position]] != value:
+        raise KeyError(value)
+    return order[position]
+
+
+def backtrack(parent, via, source, target):
+    """
+    Follows the parent links from the target back to the source.
+    """
+    path = []
+    person = target
+    while person != source:
+        path.append((via[person], person))
+        person = parent[person]
+    path.reverse()
+    return path
+
+
+def build_csr(sources, targets, count):
+    """
+    Groups the (source, target) index pairs by source. Returns the offsets array
+    (count + 1 entries) and the adjacency array holding the targets of each source.
+    """
+    offsets = array("i", [0]) * (count + 1)
+    for source in sources:
+        offsets[source + 1] += 1
+    for i in range(count):
+        offsets[i + 1] += offsets[i]
+
+    position = offsets[:-1]
+    adjacency = array("i", [0]) * len(sources)
+    for source, target in zip(sources, targets):
+        adjacency[position[source]] = target
+        position[source] += 1
+
+    return offsets, adjacency
+
+
+def load_graph(directory, snapshot=False):
+    """
+    Load data from CSV files into a compact Graph.
+
+    If snapshot is True, the graph is loaded from a binary snapshot in the
+    directory when one exists for the current CSV files, and a new snapshot
+    is written after parsing the CSV files otherwise.
+    """
+    if snapshot:
+        graph = read_snapshot(directory)
+        if graph is not None:
+            return graph
+
+    graph = parse_csv(directory)
+
+    if snapshot:
+        try:
+            write_snapshot(graph, directory)
+        except OSError:
+            # The cache is optional, e.g. the data directory may be read only.
+            pass
+
+    return graph
+
+
+def parse_csv(directory):
+    """
+    Parse the CSV files of a directory into a compact Graph.
+    """
+    graph = Graph()
+
+    # IMDb id -> index, only while the stars are read.
+    person_index = {}
+    movie_index = {}
+
+    # Load people
+    with open(f"{directory}/people.csv", encoding="utf-8") as f:
+        reader = csv.DictReader(f)
+        for row in reader:
+            person_index[row["id"]] = graph.add_person(row["id"], row["name"], row["birth"])
+
+    # Load movies
+    with open(f"{directory}/movies.csv", encoding="utf-8") as f:
+        reader = csv.DictReader(f)
+        for row in reader:
+            movie_index[row["id"]] = graph.add_movie(row["id"], row["title"], row["year"])
+
+    # Load stars, skipping rows that reference unknown people or movies.
+    star_people = array("i")
+    star_movies = array("i")
+    with open(f"{directory}/stars.csv", encoding="utf-8") as f:
+        reader = csv.DictReader(f)
+        for row in reader:
+            person = person_index.get(row["person_id"])
+            movie = movie_index.get(row["movie_id"])
+            if person is None or movie is None:
+                continue
+            star_people.append(person)
+            star_movies.append(movie)
+
+    graph.set_stars(star_people, star_movies)
+    graph.build_indices()
+    return graph
+
+
+def source_stamps(directory):
+    """
+    Returns the (mtime_ns, size) pairs of the CSV files, used to invalidate snapshots.
+    """
+    stamps = []
+    for filename in SOURCE_FILES:
+        stat = os.stat(f"{directory}/{filename}")
+        stamps.extend((stat.st_mtime_ns, stat.st_size))
+    return stamps
+
+
+def string_tables(graph):
+    return (
+        graph.person_ids, graph.person_names, graph.person_births,
+        graph.movie_ids, graph.movie_titles, graph.movie_years,
+    )
+
+
+def write_snapshot(graph, directory):
+    """
+    Writes the graph into a snapshot file. The integer arrays (the adjacency,
+    the offsets of the strings and the sorted indices) are stored as raw
+    native-endian int32 data, followed by the UTF-8 data of the string tables.
+    """
+    tables = string_tables(graph)
+    header = SNAPSHOT_HEADER.pack(
+        SNAPSHOT_MAGIC,
+        SNAPSHOT_VERSION,
+        *source_stamps(directory),
+        len(graph.person_ids),
+        len(graph.movie_ids),
+        len(graph.person_movies),
+        *[len(table.data) for table in tables],
+    )
+    arrays = [
+        graph.person_offsets, graph.person_movies, graph.movie_offsets, graph.movie_stars,
+        *[table.offsets for table in tables],
+        graph.person_order, graph.movie_order, graph.name_order,
+    ]
+
+    # Write into a temporary file first, so that a concurrent reader never
+    # maps a partially written snapshot.
+    path = f"{directory}/{SNAPSHOT_FILE}"
+    try:
+        with open(f"{path}.tmp", "wb") as f:
+            f.write(header)
+            for data in arrays:
+                f.write(data.tobytes())
+            for table in tables:
+                f.write(table.data)
+        os.replace(f"{path}.tmp", path)
+    except OSError:
+        # Don't leave a partial file behind, e.g. when the disk is full.
+        try:
+            os.remove(f"{path}.tmp")
+        except OSError:
+            pass
+        raise
+
+
+def read_snapshot(directory):
+    """
+    Memory-maps the snapshot of a directory. Returns None if there is no snapshot,
+    or if it was written by another version or for different CSV files.
+    """
+    try:
+        with open(f"{directory}/{SNAPSHOT_FILE}", "rb") as f:
+            data = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+    except (OSError, ValueError):
+        return None
+
+    if len(data) < SNAPSHOT_HEADER.size:
+        return None
+    magic, version, *fields = SNAPSHOT_HEADER.unpack_from(data)
+    stamps, counts, data_sizes = fields[:6], fields[6:9], fields[9:]
+    if (magic != SNAPSHOT_MAGIC or version != SNAPSHOT_VERSION
+            or stamps != source_stamps(directory)):
+        return None
+
+    # Everything is used in place, straight from the mapped file.
+    people_count, movies_count, stars_count = counts
+    view = memoryview(data)
+    position = SNAPSHOT_HEADER.size
+
+    arrays = []
+    for length in (
+        people_count + 1, stars_count, movies_count + 1, stars_count,
+        *[people_count + 1] * 3, *[movies_count + 1] * 3,
+        people_count, movies_count, people_count,
+    ):
+        size = length * 4
+        arrays.append(view[position:position + size].cast("i"))
+        position += size
+
+    blobs = []
+    for size in data_sizes:
+        blobs.append(view[position:position + size])
+        position += size
+
+    graph = Graph()
+    (graph.person_offsets, graph.person_movies,
+     graph.movie_offsets, graph.movie_stars) = arrays[:4]
+    (graph.person_ids, graph.person_names, graph.person_births,
+     graph.movie_ids, graph.movie_titles, graph.movie_years) = [
+        StringTable(blob, offsets) for blob, offsets in zip(blobs, arrays[4:10])
+    ]
+    graph.person_order, graph.movie_order, graph.name_order = arrays[10:]
+
+    return graph
+
+
+def main():
+    if len(sys.argv) > 2:
+        sys.exit("Usage: python graph.py [directory]")
+    directory = sys.argv[1] if len(sys.argv) == 2 else "large"
+
+    # Load data from files into a compact graph
+    print("Loading data...")
+    graph = load_graph(directory, snapshot=True)
+    print("Data loaded.")
+
+    source = person_id_for_name(graph, input("Name: "))
+    if source is None:
+        sys.exit("Person not found.")
+    target = person_id_for_name(graph, input("Name: "))
+    if target is None:
+        sys.exit("Person not found.")
+
+    path = graph.shortest_path(source, target)
+
+    if path is None:
+        print("Not connected.")
+    else:
+        degrees = len(path)
+        print(f"{degrees} degrees of separation.")
+        path = [(None, source)] + path
+        for i in range(degrees):
+            person1 = graph.person_name(path[i][1])
+            person2 = graph.person_name(path[i + 1][1])
+            movie = graph.movie_title(path[i + 1][0])
+            print(f"{i + 1}: {person1} and {person2} starred in {movie}")
+
+
+def person_id_for_name(graph, name):
+    """
+    Returns the IMDB id for a person's name,
+    resolving ambiguities as needed.
+    """
+    person_ids = graph.person_ids_for_name(name)
+    if len(person_ids) == 0:
+        return None
+    elif len(person_ids) > 1:
+        print(f"Which '{name}'?")
+        for person_id in person_ids:
+            index = graph.person_index(person_id)
+            name = graph.person_names[index]
+            birth = graph.person_births[index]
+            print(f"ID: {person_id}, Name: {name}, Birth: {birth}")
+        try:
+            person_id = input("Intended Person ID: ")
+            if person_id in person_ids:
+                return person_id
+        except ValueError:
+            pass
+        return None
+    else:
+        return person_ids[0]
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,195 @@
+import argparse
+import math
+import pickle
+import sys
+from array import array
+
+import degrees
+from degrees import load_data, people, movies, shortest_path
+from graph import source_stamps
+
+# Marks people a landmark cannot reach in the distance arrays.
+UNREACHABLE = -1
+
+
+class LandmarkIndex():
+    """
+    Distances from a few landmark people to every person, used to bound the
+    distance between any two people without searching: by the triangle inequality
+    |d(L, s) - d(L, t)| <= d(s, t) <= d(L, s) + d(L, t) for every landmark L.
+    """
+
+    def __init__(self, landmarks, person_ids, distances, stamps):
+        self.landmarks = landmarks
+        self.person_ids = person_ids
+        self.position = {person_id: i for i, person_id in enumerate(person_ids)}
+        # One array per landmark, indexed by the position of the person.
+        self.distances = distances
+        # (mtime_ns, size) of the CSV files the index was built from.
+        self.stamps = stamps
+
+    @classmethod
+    def build(cls, count, directory):
+        """
+        Builds an index over the data loaded from directory, using the count
+        people that starred with the most other people (counting repeats) as landmarks.
+        """
+        landmarks = select_landmarks(count)
+        person_ids = list(people)
+        position = {person_id: i for i, person_id in enumerate(person_ids)}
+        distances = [distances_from(landmark, position) for landmark in landmarks]
+        return cls(landmarks, person_ids, distances, source_stamps(directory))
+
+    def save(self, path):
+        with open(path, "wb") as f:
+            pickle.dump(
+                (self.landmarks, self.person_ids, self.distances, self.stamps), f
+            )
+
+    @classmethod
+    def load(cls, path, directory):
+        """
+        Loads a saved index. Raises ValueError if it was built for other data
+        than the currently loaded one (from directory): if the CSV files
+        changed since, or the number of people differs.
+        """
+        with open(path, "rb") as f:
+            entries = pickle.load(f)
+        if len(entries) != 4:
+            raise ValueError("landmark index was written by another version")
+        landmarks, person_ids, distances, stamps = entries
+        if stamps != source_stamps(directory) or len(person_ids) != len(people):
+            raise ValueError("landmark index does not match the loaded data")
+        return cls(landmarks, person_ids, distances, stamps)
+
+    def bounds(self, source, target):
+        """
+        Returns (lower, upper) bounds of the degrees of separation between
+        source and target, or None if they are known not to be connected.
+        The upper bound is math.inf if no landmark reaches both people.
+        """
+        if source == target:
+            return (0, 0)
+
+        s = self.position[source]
+        t = self.position[target]
+        lower = 1
+        upper = math.inf
+        for distances in self.distances:
+            source_distance = distances[s]
+            target_distance = distances[t]
+
+            # A landmark reaching only one of the two proves they are not connected.
+            if (source_distance == UNREACHABLE) != (target_distance == UNREACHABLE):
+                return None
+            if source_distance == UNREACHABLE:
+                continue
+
+            lower = max(lower, abs(source_distance - target_distance))
+            upper = min(upper, source_distance + target_distance)
+
+        return (lower, upper)
+
+    def distance(self, source, target, exact=False):
+        """
+        Returns (lower, upper) bounds of the degrees of separation, or None if
+        source and target are not connected. If exact is True and the bounds
+        differ, a bidirectional search finds the exact distance (lower == upper).
+        """
+        bounds = self.bounds(source, target)
+        if bounds is None or not exact or bounds[0] == bounds[1]:
+            return bounds
+
+        path = shortest_path(source, target, bidirectional=True)
+        if path is None:
+            return None
+        return (len(path), len(path))
+
+
+def select_landmarks(count):
+    """
+    Returns the ids of the count people with the most co-star appearances.
+    """
+    def degree(person_id):
+        return sum(len(movies[movie_id]["stars"]) for movie_id in people[person_id]["movies"])
+
+    return sorted(people, key=degree, reverse=True)[:count]
+
+
+def distances_from(landmark, position):
+    """
+    Runs a full BFS from the landmark. Returns an array of the distances to
+    every person (by position), UNREACHABLE for people in other components.
+    """
+    distances = array("h", [UNREACHABLE]) * len(position)
+    distances[position[landmark]] = 0
+
+    # Every movie only needs to be expanded once, by the first of its stars reached.
+    expanded_movies = set()
+    layer = [landmark]
+    distance = 0
+    while layer:
+        distance += 1
+        next_layer = []
+        for person_id in layer:
+            for movie_id in people[person_id]["movies"]:
+                if movie_id in expanded_movies:
+                    continue
+                expanded_movies.add(movie_id)
+
+                for star_id in movies[movie_id]["stars"]:
+                    i = position[star_id]
+                    if distances[i] == UNREACHABLE:
+                        distances[i] = distance
+                        next_layer.append(star_id)
+        layer = next_layer
+
+    return distances
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description="Bound degrees of separation with a landmark distance index."
+    )
+    parser.add_argument("directory", help="directory with the CSV data files")
+    parser.add_argument("index", help="index file, built and saved if it does not exist")
+    parser.add_argument(
+        "--landmarks", type=int, default=16,
+        help="number of landmarks when building the index (default: 16)",
+    )
+    parser.add_argument(
+        "--exact", action="store_true",
+        help="fall back to a bidirectional search when the bounds are not tight",
+    )
+    args = parser.parse_args()
+
+    print("Loading data...")
+    load_data(args.directory)
+    print("Data loaded.")
+
+    try:
+        index = LandmarkIndex.load(args.index, args.directory)
+    except (FileNotFoundError, ValueError):
+        print("Building landmark index...")
+        index = LandmarkIndex.build(args.landmarks, args.directory)
+        index.save(args.index)
+    print("Index loaded.")
+
+    source = degrees.person_id_for_name(input("Name: "))
+    if source is None:
+        sys.exit("Person not found.")
+    target = degrees.person_id_for_name(input("Name: "))
+    if target is None:
+        sys.exit("Person not found.")
+
+    bounds = index.distance(source, target, exact=args.exact)
+    if bounds is None:
+        print("Not connected.")
+    elif bounds[0] == bounds[1]:
+        print(f"{bounds[0]} degrees of separation.")
+    else:
+        print(f"Between {bounds[0]} and {bounds[1]} degrees of separation.")
+
+
+if __name__ == "__main__":
+    main()
@@ -1,3 +1,12 @@
+import csv
+import math
+from array import array
+from bisect import bisect_left
+from collections import Counter, OrderedDict, deque
+from difflib import SequenceMatcher
+from itertools import chain, islice
+
+
 class Node():
     def __init__(self, state, parent, action):
         self.state = state
@@ -7,13 +16,16 @@ class Node():
 
 class StackFrontier():
     def __init__(self):
-        self.frontier = []
+        self.frontier = deque()
+        # Number of nodes in the frontier for each state, for constant time lookups.
+        self.states = {}
 
     def add(self, node):
         self.frontier.append(node)
+        self.states[node.state] = self.states.get(node.state, 0) + 1
 
     def contains_state(self, state):
-        return any(node.state == state for node in self.frontier)
+        return state in self.states
 
     def empty(self):
         return len(self.frontier) == 0
@@ -22,9 +34,16 @@ class StackFrontier():
         if self.empty():
             raise Exception("empty frontier")
         else:
-            node = self.frontier[-1]
-            self.frontier = self.frontier[:-1]
-            return node
+            return self._forget(self.frontier.pop())
+
+    def _forget(self, node):
+        """Removes a node that left the frontier from the state index."""
+        count = self.states[node.state] - 1
+        if count:
+            self.states[node.state] = count
+        else:
+            del self.states[node.state]
+        return node
 
 
 class QueueFrontier(StackFrontier):
@@ -33,6 +52,240 @@ class QueueFrontier(StackFrontier):
         if self.empty():
             raise Exception("empty frontier")
         else:
-            node = self.frontier[0]
-            self.frontier = self.frontier[1:]
-            return node
+            return self._forget(self.frontier.popleft())
+
+
+class LRUCache():
+    """
+    Bounded least-recently-used cache. Every entry has a size (its weight towards
+    the capacity) and the least recently used entries are evicted once the total
+    size exceeds the capacity. Hit, miss and eviction counters are kept for tuning.
+    """
+
+    def __init__(self, capacity):
+        self.capacity = capacity
+        self.entries = OrderedDict()
+        self.size = 0
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def __len__(self):
+        return len(self.entries)
+
+    def get(self, key, compute, sizeof=len):
+        """
+        Returns the cached value for the key, computing (and caching) it on a miss.
+        """
+        try:
+            value = self.entries[key]
+        except KeyError:
+            self.misses += 1
+        else:
+            self.hits += 1
+            self.entries.move_to_end(key)
+            return value
+
+        value = compute(key)
+        size = sizeof(value)
+
+        # Values larger than the whole cache are returned, but not stored.
+        if size > self.capacity:
+            return value
+
+        self.entries[key] = value
+        self.size += size
+        while self.size > self.capacity:
+            _, evicted = self.entries.popitem(last=False)
+            self.size -= sizeof(evicted)
+            self.evictions += 1
+
+        return value
+
+    def clear(self):
+        self.entries.clear()
+        self.size = 0
+
+    def stats(self):
+        return {
+            "entries": len(self.entries),
+            "size": self.size,
+            "capacity": self.capacity,
+            "hits": self.hits,
+            "misses": self.misses,
+            "evictions": self.evictions,
+        }
+
+
+class SideTable():
+    """
+    Columns of a CSV file that are only needed for output, keyed by an id column.
+
+    Only the hash of each id and the byte offset of its row are kept in memory,
+    in two sorted arrays; a row is read from the file when it is looked up.
+    The file is not opened until the first lookup (or load).
+    """
+
+    def __init__(self, path, key, columns):
+        self.path = path
+        self.key = key
+        self.columns = columns
+        # Sorted hashes of the ids and the offsets of their rows, see load.
+        self.hashes = None
+        self.offsets = None
+        # Positions of the key and of the columns in a row.
+        self.key_index = None
+        self.column_indices = None
+
+    def get(self, key, column):
+        if self.hashes is None:
+            self.load()
+
+        # The file is opened for every lookup rather than kept open, as forked
+        # worker processes would share (and race on) its position.
+        key_hash = hash(key)
+        with open(self.path, "rb") as f:
+            for i in range(bisect_left(self.hashes, key_hash), len(self.hashes)):
+                if self.hashes[i] != key_hash:
+                    break
+                f.seek(self.offsets[i])
+                row = next(csv.reader(decoded_lines(f)))
+                # Different ids may share a hash.
+                if row[self.key_index] == key:
+                    return row[self.column_indices[self.columns.index(column)]]
+        raise KeyError(key)
+
+    def load(self):
+        """
+        Reads the file once to index the offsets of its rows.
+        """
+        # csv.reader pulls the lines of a row (more than one if a quoted field
+        # spans lines) from lines(), which records where each line starts.
+        line_offsets = array("q")
+
+        def lines(f):
+            position = f.tell()
+            for line in f:
+                line_offsets.append(position)
+                position += len(line)
+                yield line.decode("utf-8")
+
+        entries = []
+        with open(self.path, "rb") as f:
+            reader = csv.reader(lines(f))
+            header = next(reader)
+            self.key_index = header.index(self.key)
+            self.column_indices = [header.index(column) for column in self.columns]
+            row_start = reader.line_num
+            for row in reader:
+                entries.append((hash(row[self.key_index]), line_offsets[row_start]))
+                row_start = reader.line_num
+
+        entries.sort()
+        self.hashes = array("q", (key_hash for key_hash, _ in entries))
+        self.offsets = array("q", (offset for _, offset in entries))
+
+
+def decoded_lines(f):
+    """
+    Yields the lines of a binary file from its current position, decoded as UTF-8.
+    """
+    for line in iter(f.readline, b""):
+        yield line.decode("utf-8")
+
+
+class NameIndex():
+    """
+    Index over lowercase names: a sorted list for prefix completion with bisect,
+    and a trigram index that narrows down the candidates for fuzzy matching.
+    """
+
+    # Most candidates (by shared trigrams) that are scored with difflib.
+    max_candidates = 200
+
+    def __init__(self, names):
+        self.sorted_names = sorted(names)
+
+        # Trigram -> indices of the names containing it. Names share many
+        # words, so the posting lists of each word's trigrams are looked up once.
+        postings = {}
+        word_postings = {}
+        for index, name in enumerate(self.sorted_names):
+            for word in name.split():
+                lists = word_postings.get(word)
+                if lists is None:
+                    lists = word_postings[word] = [
+                        postings.setdefault(gram, []) for gram in trigrams(word)
+                    ]
+                for indices in lists:
+                    # The trigram may also be in an earlier word of the name.
+                    if not indices or indices[-1] != index:
+                        indices.append(index)
+        self.grams = {gram: array("i", indices) for gram, indices in postings.items()}
+
+    def complete(self, prefix, limit=10):
+        """
+        Returns up to limit names starting with the prefix, in alphabetical order.
+        """
+        prefix = prefix.lower()
+        start = bisect_left(self.sorted_names, prefix)
+        matches = []
+        for name in islice(self.sorted_names, start, start + limit):
+            if not name.startswith(prefix):
+                break
+            matches.append(name)
+        return matches
+
+    def similar(self, name, limit=5, cutoff=0.6, overlap=0.5):
+        """
+        Returns up to limit names similar to the given one, best matches first.
+
+        Candidates are found through the trigrams they share with the name
+        (any name sharing the overlap fraction of them is found). Up to
+        max_candidates of them, those sharing the most, are scored by the best
+        difflib ratio between the name and either the whole candidate or a run
+        of as many of its words, so that "hanx" matches "tom hanks".
+        """
+        name = " ".join(name.lower().split())
+        grams = trigrams(name)
+        if not grams:
+            return []
+
+        # A name sharing at least `shared` trigrams with the query contains
+        # one of its len(grams) - shared + 1 rarest ones, so only their
+        # (shortest) postings need to be scanned.
+        postings = sorted((self.grams.get(gram, ()) for gram in grams), key=len)
+        shared = max(1, math.ceil(len(grams) * overlap))
+        counts = Counter(chain.from_iterable(postings[:len(grams) - shared + 1]))
+
+        matcher = SequenceMatcher(b=name)
+        width = len(name.split())
+        scored = []
+        for index, _ in counts.most_common(self.max_candidates):
+            candidate = self.sorted_names[index]
+            words = candidate.split()
+            windows = {candidate} | {
+                " ".join(words[i:i + width]) for i in range(len(words) - width + 1)
+            }
+
+            best = 0
+            for window in windows:
+                matcher.set_seq1(window)
+                if (matcher.real_quick_ratio() >= cutoff
+                        and matcher.quick_ratio() >= cutoff):
+                    best = max(best, matcher.ratio())
+            if best >= cutoff:
+                scored.append((-best, candidate))
+
+        return [candidate for _, candidate in sorted(scored)[:limit]]
+
+
+def trigrams(name):
+    """
+    Returns the set of three-character substrings of the padded words of a name.
+    """
+    grams = set()
+    for word in name.split():
+        padded = f"  {word} "
+        grams.update(padded[i:i + 3] for i in range(len(padded) - 2))
+    return grams
@@ -0,0 +1,178 @@
+"""
+Tic Tac Toe arena
+
+Plays many headless games between engines through the tictactoe module API
+and reports the results, games per second, nodes per second and the latency
+percentiles of the engines' moves, e.g.:
+
+    python arena.py --games 1000 --x minimax --o random --workers 4
+"""
+
+import argparse
+import multiprocessing
+import random
+import time
+
+import bitboard
+import tictactoe as ttt
+
+ENGINES = ("minimax", "search", "bitboard", "random")
+
+
+def choose_move(engine, board, rng, time_budget, win_length=None):
+    """
+    Returns the move of the engine and the number of search nodes it visited.
+    """
+    if engine == "random":
+        return rng.choice(sorted(ttt.actions(board))), 0
+    if engine == "bitboard":
+        return bitboard.minimax(board), 0
+
+    # "search" skips the opening book, to load the alpha-beta search itself.
+    move = ttt.minimax(
+        board, time_budget, use_book=(engine == "minimax"), win_length=win_length
+    )
+    return move, ttt.search_stats["nodes"]
+
+
+def play_game(engines, size, rng, time_budget, win_length=None):
+    """
+    Plays one game between the engines (a dict keyed by X and O).
+    Returns the winner (None for a tie), the latencies of the non-random
+    moves in seconds and the number of search nodes visited.
+    """
+    board = ttt.initial_state(size)
+    latencies = []
+    nodes = 0
+
+    while not ttt.terminal(board, win_length):
+        engine = engines[ttt.player(board)]
+        start = time.perf_counter()
+        move, move_nodes = choose_move(engine, board, rng, time_budget, win_length)
+        if engine != "random":
+            latencies.append(time.perf_counter() - start)
+        nodes += move_nodes
+        board = ttt.result(board, move)
+
+    return ttt.winner(board, win_length), latencies, nodes
+
+
+def play_games(task):
+    """
+    Plays a number of games, the unit of work of the arena's worker processes.
+    Returns the tally of winners, all move latencies and the total nodes.
+    """
+    games, engines, size, win_length, time_budget, seed = task
+    rng = random.Random(seed)
+
+    tally = {ttt.X: 0, ttt.O: 0, None: 0}
+    latencies = []
+    nodes = 0
+    for _ in range(games):
+        winner, game_latencies, game_nodes = play_game(
+            engines, size, rng, time_budget, win_length
+        )
+        tally[winner] += 1
+        latencies.extend(game_latencies)
+        nodes += game_nodes
+
+    return tally, latencies, nodes
+
+
+def percentile(values, p):
+    """
+    Returns the p-th percentile (nearest rank) of sorted values.
+    """
+    if not values:
+        return 0
+    rank = max(0, min(len(values) - 1, round(p / 100 * len(values)) - 1))
+    return values[rank]
+
+
+def run(games, engines, size=3, win_length=None, time_budget=None, workers=1, seed=0):
+    """
+    Plays the games, split over the given number of worker processes.
+    Returns a dict with the results and the throughput measurements.
+    """
+    # Split the games into one chunk per worker, each with its own random seed.
+    chunks = [games // workers + (i < games % workers) for i in range(workers)]
+    tasks = [
+        (chunk, engines, size, win_length, time_budget, seed + i)
+        for i, chunk in enumerate(chunks) if chunk
+    ]
+
+    start = time.perf_counter()
+    if workers > 1:
+        with multiprocessing.Pool(workers) as pool:
+            results = pool.map(play_games, tasks)
+    else:
+        results = [play_games(task) for task in tasks]
+    elapsed = time.perf_counter() - start
+
+    tally = {ttt.X: 0, ttt.O: 0, None: 0}
+    latencies = []
+    nodes = 0
+    for game_tally, game_latencies, game_nodes in results:
+        for winner, count in game_tally.items():
+            tally[winner] += count
+        latencies.extend(game_latencies)
+        nodes += game_nodes
+    latencies.sort()
+
+    # The search time is summed over all workers, so nodes/sec is per process.
+    search_time = sum(latencies)
+    return {
+        "games": games,
+        "x_wins": tally[ttt.X],
+        "o_wins": tally[ttt.O],
+        "ties": tally[None],
+        "seconds": elapsed,
+        "games_per_second": games / elapsed if elapsed else 0,
+        "nodes": nodes,
+        "nodes_per_second": nodes / search_time if search_time else 0,
+        "moves": len(latencies),
+        "latency_p50": percentile(latencies, 50),
+        "latency_p90": percentile(latencies, 90),
+        "latency_p99": percentile(latencies, 99),
+        "latency_max": latencies[-1] if latencies else 0,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Play headless Tic Tac Toe games.")
+    parser.add_argument("--games", type=int, default=100)
+    parser.add_argument("--x", choices=ENGINES, default="minimax", help="engine playing X")
+    parser.add_argument("--o", choices=ENGINES, default="random", help="engine playing O")
+    parser.add_argument("--size", type=int, default=3, help="board size")
+    parser.add_argument("--win-length", type=int, help="marks in a row to win")
+    parser.add_argument(
+        "--time-budget", type=float,
+        help=f"seconds per search move (default: {ttt.TIME_BUDGET} on large boards)",
+    )
+    parser.add_argument("--workers", type=int, default=1, help="worker processes")
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+
+    if "bitboard" in (args.x, args.o) and (
+        args.size != 3 or args.win_length not in (None, 3)
+    ):
+        parser.error("the bitboard engine only plays the classic 3x3 game")
+
+    stats = run(
+        args.games, {ttt.X: args.x, ttt.O: args.o}, args.size, args.win_length,
+        args.time_budget, args.workers, args.seed,
+    )
+
+    print(f"{stats['games']} games: X won {stats['x_wins']}, "
+          f"O won {stats['o_wins']}, {stats['ties']} ties")
+    print(f"{stats['games_per_second']:.1f} games/s, "
+          f"{stats['nodes_per_second']:.0f} nodes/s")
+    print(f"{stats['moves']} engine moves, latency "
+          f"p50 {stats['latency_p50'] * 1000:.3f}ms, "
+          f"p90 {stats['latency_p90'] * 1000:.3f}ms, "
+          f"p99 {stats['latency_p99'] * 1000:.3f}ms, "
+          f"max {stats['latency_max'] * 1000:.3f}ms")
+
+
+if __name__ == "__main__":
+    main()
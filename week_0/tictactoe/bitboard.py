@@ -0,0 +1,106 @@
+"""
+Tic Tac Toe engine on bitboards
+
+Each player's marks are stored as a 9-bit integer, bit 3 * i + j standing for
+the cell (i, j). Solved positions are kept in a transposition table, so every
+position is searched at most once per process.
+"""
+
+from functools import lru_cache
+
+from tictactoe import X, O
+
+FULL = 0b111111111
+
+# Bit masks of the three rows, three columns and two diagonals.
+WIN_MASKS = (
+    0b000000111, 0b000111000, 0b111000000,
+    0b001001001, 0b010010010, 0b100100100,
+    0b100010001, 0b001010100,
+)
+
+
+def to_bitboard(board):
+    """
+    Returns the (x, o) bitboards of a list of lists board.
+    """
+    x = o = 0
+    for i, row in enumerate(board):
+        for j, field in enumerate(row):
+            if field == X:
+                x |= 1 << (3 * i + j)
+            elif field == O:
+                o |= 1 << (3 * i + j)
+    return x, o
+
+
+def has_won(bits):
+    """
+    Returns True if the marks in bits complete a row, column or diagonal.
+    """
+    for mask in WIN_MASKS:
+        if bits & mask == mask:
+            return True
+    return False
+
+
+@lru_cache(maxsize=None)
+def value(x, o):
+    """
+    Returns the minimax utility of a position: 1 if X wins, -1 if O wins, 0 for a tie.
+    The cache acts as the transposition table.
+    """
+    if has_won(x):
+        return 1
+    if has_won(o):
+        return -1
+
+    empty = FULL & ~(x | o)
+    if not empty:
+        return 0
+
+    x_to_move = bin(x).count("1") == bin(o).count("1")
+    best = -2 if x_to_move else 2
+    while empty:
+        move = empty & -empty
+        empty ^= move
+        if x_to_move:
+            best = max(best, value(x | move, o))
+            if best == 1:
+                break
+        else:
+            best = min(best, value(x, o | move))
+            if best == -1:
+                break
+
+    return best
+
+
+def minimax(board):
+    """
+    Returns the optimal action for the current player on the board,
+    or None if the game is over.
+    """
+    x, o = to_bitboard(board)
+    if has_won(x) or has_won(o) or x | o == FULL:
+        return None
+
+    x_to_move = bin(x).count("1") == bin(o).count("1")
+    best_action = None
+    best_value = None
+    for cell in range(9):
+        move = 1 << cell
+        if (x | o) & move:
+            continue
+
+        # Score the move from the point of view of the player making it.
+        if x_to_move:
+            v = value(x | move, o)
+        else:
+            v = -value(x, o | move)
+
+        if best_value is None or v > best_value:
+            best_value = v
+            best_action = divmod(cell, 3)
+
+    return best_action
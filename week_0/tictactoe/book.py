@@ -0,0 +1,153 @@
+"""
+Tic Tac Toe opening book
+
+Best moves for every reachable, unfinished position of the classic 3x3 game.
+Positions are reduced under the 8 symmetries of the board (rotations and
+reflections), so only one of each group of equivalent positions is stored.
+
+The book is a binary file of (position, move) entries, generated with
+"python book.py", and is consulted by tictactoe.minimax before searching.
+"""
+
+import os
+import struct
+import sys
+
+BOOK_FILE = os.path.join(os.path.dirname(os.path.abspath(__file__)), "book.bin")
+BOOK_MAGIC = b"TTTB"
+BOOK_VERSION = 1
+
+# A position is a base 3 number of its cells (0 empty, 1 X, 2 O), cell 3 * i + j
+# being the (3 * i + j)-th digit; a move is the index of its cell.
+ENTRY = struct.Struct("<HB")
+DIGITS = {None: 0, "X": 1, "O": 2}
+
+# Where each cell goes under each of the 8 symmetries of the board.
+SYMMETRIES = [
+    [3 * i2 + j2 for i2, j2 in (transform(i, j) for i in range(3) for j in range(3))]
+    for transform in (
+        lambda i, j: (i, j),
+        lambda i, j: (j, 2 - i),
+        lambda i, j: (2 - i, 2 - j),
+        lambda i, j: (2 - j, i),
+        lambda i, j: (i, 2 - j),
+        lambda i, j: (2 - i, j),
+        lambda i, j: (j, i),
+        lambda i, j: (2 - j, 2 - i),
+    )
+]
+
+# The loaded book, mapping canonical positions to moves (None until loaded).
+book = None
+
+
+def encode(cells):
+    """
+    Returns the position number of a list of 9 cell digits.
+    """
+    code = 0
+    for digit in reversed(cells):
+        code = code * 3 + digit
+    return code
+
+
+def canonical(board):
+    """
+    Returns the smallest position number among the symmetries of the board
+    and the symmetry that produces it.
+    """
+    cells = [DIGITS[field] for row in board for field in row]
+    best = None
+    for index, symmetry in enumerate(SYMMETRIES):
+        transformed = [0] * 9
+        for cell, target in enumerate(symmetry):
+            transformed[target] = cells[cell]
+        code = encode(transformed)
+        if best is None or code < best[0]:
+            best = (code, index)
+    return best
+
+
+def load(path=BOOK_FILE):
+    """
+    Reads a book file. Returns an empty book if the file is missing or was
+    written by another version.
+    """
+    try:
+        with open(path, "rb") as f:
+            data = f.read()
+    except FileNotFoundError:
+        return {}
+
+    if data[:4] != BOOK_MAGIC or data[4] != BOOK_VERSION:
+        return {}
+    return dict(ENTRY.iter_unpack(data[5:]))
+
+
+def lookup(board):
+    """
+    Returns the book move (i, j) for a 3x3 board, or None if the position
+    is not in the book (e.g. when the game is over).
+    """
+    global book
+    if book is None:
+        book = load()
+
+    code, index = canonical(board)
+    move = book.get(code)
+    if move is None:
+        return None
+
+    # The book move is in the coordinates of the canonical position,
+    # find the cell of the board that the symmetry moves there.
+    cell = SYMMETRIES[index].index(move)
+    return divmod(cell, 3)
+
+
+def generate():
+    """
+    Solves every reachable, unfinished position once per symmetry class.
+    Returns a dict mapping canonical positions to the best move.
+    """
+    import bitboard
+    import tictactoe as ttt
+
+    entries = {}
+    seen = set()
+
+    def visit(board):
+        code, index = canonical(board)
+        if code in seen or ttt.terminal(board):
+            return
+        seen.add(code)
+
+        # Store the move in the coordinates of the canonical position.
+        i, j = bitboard.minimax(board)
+        entries[code] = SYMMETRIES[index][3 * i + j]
+
+        for action in ttt.actions(board):
+            visit(ttt.result(board, action))
+
+    visit(ttt.initial_state())
+    return entries
+
+
+def save(entries, path=BOOK_FILE):
+    with open(path, "wb") as f:
+        f.write(BOOK_MAGIC + bytes([BOOK_VERSION]))
+        for code in sorted(entries):
+            f.write(ENTRY.pack(code, entries[code]))
+
+
+def main():
+    if len(sys.argv) > 2:
+        sys.exit("Usage: python book.py [book file]")
+    path = sys.argv[1] if len(sys.argv) == 2 else BOOK_FILE
+
+    entries = generate()
+    save(entries, path)
+    print(f"Wrote {len(entries)} positions to {path}.")
+
+
+if __name__ == "__main__":
+    main()
@@ -2,8 +2,15 @@ import pygame
 import sys
 import time
 
+import bitboard
 import tictactoe as ttt
 
+# Optional board size and winning length, e.g. "python runner.py 4 3".
+if len(sys.argv) > 3:
+    sys.exit("Usage: python runner.py [board size] [win length]")
+board_size = int(sys.argv[1]) if len(sys.argv) > 1 else 3
+win_length = int(sys.argv[2]) if len(sys.argv) > 2 else None
+
 pygame.init()
 size = width, height = 600, 400
 
@@ -15,10 +22,15 @@ screen = pygame.display.set_mode(size)
 
 mediumFont = pygame.font.Font("OpenSans-Regular.ttf", 28)
 largeFont = pygame.font.Font("OpenSans-Regular.ttf", 40)
-moveFont = pygame.font.Font("OpenSans-Regular.ttf", 60)
+
+# Fit the board between the title and the "Play Again" button.
+tile_size = min(80, 240 // board_size)
+moveFont = pygame.font.Font("OpenSans-Regular.ttf", tile_size * 3 // 4)
 
 user = None
-board = ttt.initial_state()
+# The game state keeps the win and draw detection up to date move by move.
+state = ttt.GameState(board_size, win_length)
+board = state.board
 ai_turn = False
 
 while True:
@@ -67,12 +79,14 @@ while True:
     else:
 
         # Draw game board
-        tile_size = 80
-        tile_origin = (width / 2 - (1.5 * tile_size), height / 2 - (1.5 * tile_size))
+        tile_origin = (
+            width / 2 - (board_size / 2 * tile_size),
+            height / 2 - (board_size / 2 * tile_size),
+        )
         tiles = []
-        for i in range(3):
+        for i in range(board_size):
             row = []
-            for j in range(3):
+            for j in range(board_size):
                 rect = pygame.Rect(
                     tile_origin[0] + j * tile_size,
                     tile_origin[1] + i * tile_size,
@@ -89,12 +103,12 @@ while True:
                 row.append(rect)
             tiles.append(row)
 
-        game_over = ttt.terminal(board)
-        player = ttt.player(board)
+        game_over = state.terminal()
+        player = state.player()
 
         # Show title
         if game_over:
-            winner = ttt.winner(board)
+            winner = state.winner
             if winner is None:
                 title = f"Game Over: Tie."
             else:
@@ -112,8 +126,13 @@ while True:
         if user != player and not game_over:
             if ai_turn:
                 time.sleep(0.5)
-                move = ttt.minimax(board)
-                board = ttt.result(board, move)
+                # The bitboard engine solves the classic game, larger
+                # variants are searched under a time budget.
+                if board_size == 3 and state.length == 3:
+                    move = bitboard.minimax(board)
+                else:
+                    move = ttt.minimax(board, ttt.TIME_BUDGET, win_length=win_length)
+                state.make(move)
                 ai_turn = False
             else:
                 ai_turn = True
@@ -122,10 +141,10 @@ while True:
         click, _, _ = pygame.mouse.get_pressed()
         if click == 1 and user == player and not game_over:
             mouse = pygame.mouse.get_pos()
-            for i in range(3):
-                for j in range(3):
+            for i in range(board_size):
+                for j in range(board_size):
                     if board[i][j] == ttt.EMPTY and tiles[i][j].collidepoint(mouse):
-                        board = ttt.result(board, (i, j))
+                        state.make((i, j))
 
         if game_over:
             againButton = pygame.Rect(width / 3, height - 65, width / 3, 50)
@@ -140,7 +159,8 @@ while True:
                 if againButton.collidepoint(mouse):
                     time.sleep(0.2)
                     user = None
-                    board = ttt.initial_state()
+                    state = ttt.GameState(board_size, win_length)
+                    board = state.board
                     ai_turn = False
 
     pygame.display.flip()
@@ -0,0 +1,321 @@
+"""
+Tic Tac Toe game server
+
+Hosts many simultaneous games over a simple line protocol (TCP or a Unix
+socket). The AI moves are computed in a pool of worker processes, and solved
+positions are shared between all sessions through one cache.
+
+Commands (one per line) and responses:
+
+    NEW [size] [X|O] [length]
+                        start a game as X (default) or O, length in a row
+                        wins (default: size)             -> OK <game> <board> <status>
+    MOVE <game> <i> <j> play a move, the AI answers      -> OK <game> <board> <status>
+    BOARD <game>        show a game                      -> OK <game> <board> <status>
+    QUIT                close the connection
+
+The board is sent row by row, rows separated by "/" with "." for empty cells.
+The status is PLAY while the game goes on, X or O for the winner, or TIE.
+Errors are answered with ERR <message>.
+
+    python server.py serve --port 5050
+    python server.py bench --clients 50 --games 20
+"""
+
+import argparse
+import asyncio
+import multiprocessing
+import random
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+import tictactoe as ttt
+from arena import percentile
+
+# Largest number of positions kept in the solved-position cache.
+CACHE_SIZE = 100000
+
+# Largest board size a game can be started with.
+MAX_SIZE = 7
+
+
+def solve(board, time_budget, win_length):
+    """
+    Returns the AI move for the board, run in the worker processes.
+    """
+    return ttt.minimax(board, time_budget, win_length=win_length)
+
+
+def format_board(board):
+    return "/".join(
+        "".join(field if field != ttt.EMPTY else "." for field in row) for row in board
+    )
+
+
+def status(board, win_length):
+    if not ttt.terminal(board, win_length):
+        return "PLAY"
+    return ttt.winner(board, win_length) or "TIE"
+
+
+class GameServer():
+    """
+    Games of all connections, the worker pool and the shared cache of solved positions.
+    """
+
+    def __init__(self, workers=None, time_budget=None):
+        # Spawned rather than forked workers, which would inherit the open client
+        # sockets and keep connections from closing.
+        self.pool = ProcessPoolExecutor(workers, mp_context=multiprocessing.get_context("spawn"))
+        self.time_budget = time_budget
+        self.games = {}
+        self.next_game = 1
+
+        # (Board, win length) -> future of its AI move. Futures (rather than moves) are cached,
+        # so that sessions asking for a position being solved wait for that search.
+        self.solved = {}
+        self.cache_hits = 0
+        self.cache_misses = 0
+
+    def close(self):
+        self.pool.shutdown()
+
+    async def ai_move(self, board, win_length):
+        """
+        Returns the AI move for the board, from the cache or from a worker.
+        """
+        key = (ttt.board_key(board), win_length)
+        future = self.solved.get(key)
+        if future is not None:
+            self.cache_hits += 1
+            return await future
+        self.cache_misses += 1
+
+        # Only exactly solved positions are shared, not those searched under
+        # a time budget, whose moves depend on how deep the search got.
+        exact = sum(row.count(ttt.EMPTY) for row in board) <= ttt.FULL_SEARCH_CELLS
+        budget = None if exact else self.time_budget
+
+        loop = asyncio.get_running_loop()
+        future = loop.run_in_executor(self.pool, solve, board, budget, win_length)
+        if exact:
+            if len(self.solved) >= CACHE_SIZE:
+                # Evict the oldest entry (dicts keep insertion order).
+                del self.solved[next(iter(self.solved))]
+            self.solved[key] = future
+
+        try:
+            return await future
+        except Exception:
+            self.solved.pop(key, None)
+            raise
+
+    async def play_ai(self, game):
+        board, user, win_length = game
+        if not ttt.terminal(board, win_length) and ttt.player(board) != user:
+            move = await self.ai_move(board, win_length)
+            game[0] = ttt.result(board, move)
+
+    async def execute(self, owned, line):
+        """
+        Executes one command of a connection owning the given game ids.
+        Returns the response line, or None to close the connection.
+        """
+        command, *args = line.split()
+        command = command.upper()
+
+        if command == "QUIT":
+            return None
+
+        if command == "NEW":
+            size = int(args[0]) if args else 3
+            user = args[1].upper() if len(args) > 1 else ttt.X
+            win_length = int(args[2]) if len(args) > 2 else size
+            if (not 1 <= size <= MAX_SIZE or user not in (ttt.X, ttt.O)
+                    or not 1 <= win_length <= size):
+                raise ValueError("usage: NEW [size] [X|O] [length]")
+            game_id = self.next_game
+            self.next_game += 1
+            self.games[game_id] = [ttt.initial_state(size), user, win_length]
+            owned.add(game_id)
+            await self.play_ai(self.games[game_id])
+            return self.respond(game_id)
+
+        if command == "MOVE":
+            if len(args) != 3:
+                raise ValueError("usage: MOVE <game> <i> <j>")
+            game_id, i, j = (int(arg) for arg in args)
+            if game_id not in owned:
+                raise ValueError("no such game")
+            game = self.games[game_id]
+            board, user, win_length = game
+            if ttt.terminal(board, win_length) or ttt.player(board) != user:
+                raise ValueError("not your turn")
+            if not (0 <= i < len(board) and 0 <= j < len(board)):
+                raise ValueError("move outside of the board")
+            game[0] = ttt.result(board, (i, j))
+            await self.play_ai(game)
+            return self.respond(game_id)
+
+        if command == "BOARD":
+            if len(args) != 1:
+                raise ValueError("usage: BOARD <game>")
+            game_id = int(args[0])
+            if game_id not in owned:
+                raise ValueError("no such game")
+            return self.respond(game_id)
+
+        raise ValueError(f"unknown command {command}")
+
+    def respond(self, game_id):
+        board, _, win_length = self.games[game_id]
+        return f"OK {game_id} {format_board(board)} {status(board, win_length)}"
+
+    async def handle(self, reader, writer):
+        """
+        Serves one connection until it quits or disconnects.
+        """
+        owned = set()
+        try:
+            while line := await reader.readline():
+                if not line.strip():
+                    continue
+                try:
+                    response = await self.execute(owned, line.decode())
+                except (ValueError, IndexError, RuntimeError) as e:
+                    response = f"ERR {e}"
+                if response is None:
+                    break
+                writer.write(f"{response}\n".encode())
+                await writer.drain()
+        finally:
+            for game_id in owned:
+                del self.games[game_id]
+            writer.close()
+
+
+async def serve(game_server, host=None, port=None, path=None):
+    if path:
+        server = await asyncio.start_unix_server(game_server.handle, path)
+    else:
+        server = await asyncio.start_server(game_server.handle, host, port)
+    return server
+
+
+async def play_client(host, port, games, rng, latencies):
+    """
+    A client playing random moves as X until its games are over.
+    Records the round trip time of every request.
+    """
+    reader, writer = await asyncio.open_connection(host, port)
+
+    async def request(line):
+        start = time.perf_counter()
+        writer.write(f"{line}\n".encode())
+        await writer.drain()
+        response = (await reader.readline()).decode().split()
+        latencies.append(time.perf_counter() - start)
+        if response[0] != "OK":
+            raise RuntimeError(" ".join(response))
+        return response
+
+    for _ in range(games):
+        _, game_id, board, game_status = await request("NEW")
+        while game_status == "PLAY":
+            empty = [
+                (i, j) for i, row in enumerate(board.split("/"))
+                for j, field in enumerate(row) if field == "."
+            ]
+            i, j = rng.choice(empty)
+            _, _, board, game_status = await request(f"MOVE {game_id} {i} {j}")
+
+    writer.write(b"QUIT\n")
+    await writer.drain()
+    writer.close()
+
+
+async def benchmark(clients, games, workers, seed=0):
+    """
+    Runs a server on a free local port and plays games from many concurrent
+    clients against it. Returns the throughput and latency measurements.
+    """
+    game_server = GameServer(workers)
+    server = await serve(game_server, "127.0.0.1", 0)
+    port = server.sockets[0].getsockname()[1]
+
+    latencies = []
+    start = time.perf_counter()
+    try:
+        await asyncio.gather(*(
+            play_client("127.0.0.1", port, games, random.Random(seed + i), latencies)
+            for i in range(clients)
+        ))
+    finally:
+        elapsed = time.perf_counter() - start
+        server.close()
+        await server.wait_closed()
+        game_server.close()
+
+    latencies.sort()
+    return {
+        "games": clients * games,
+        "seconds": elapsed,
+        "games_per_second": clients * games / elapsed,
+        "requests": len(latencies),
+        "latency_p50": percentile(latencies, 50),
+        "latency_p99": percentile(latencies, 99),
+        "cache_hits": game_server.cache_hits,
+        "cache_misses": game_server.cache_misses,
+    }
+
+
+async def run_server(args):
+    game_server = GameServer(args.workers, args.time_budget)
+    server = await serve(game_server, args.host, args.port, args.unix)
+    print(f"Serving on {args.unix or f'{args.host}:{args.port}'}")
+    try:
+        async with server:
+            await server.serve_forever()
+    finally:
+        game_server.close()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Tic Tac Toe game server.")
+    parser.add_argument("--workers", type=int, help="AI worker processes (default: CPUs)")
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    serve_parser = commands.add_parser("serve", help="run the server")
+    serve_parser.add_argument("--host", default="127.0.0.1")
+    serve_parser.add_argument("--port", type=int, default=5050)
+    serve_parser.add_argument("--unix", help="listen on this Unix socket path instead")
+    serve_parser.add_argument(
+        "--time-budget", type=float,
+        help=f"seconds per AI move on large boards (default: {ttt.TIME_BUDGET})",
+    )
+
+    bench_parser = commands.add_parser("bench", help="benchmark concurrent clients")
+    bench_parser.add_argument("--clients", type=int, default=50)
+    bench_parser.add_argument("--games", type=int, default=10, help="games per client")
+    bench_parser.add_argument("--seed", type=int, default=0)
+
+    args = parser.parse_args()
+
+    if args.command == "serve":
+        try:
+            asyncio.run(run_server(args))
+        except KeyboardInterrupt:
+            pass
+    else:
+        stats = asyncio.run(benchmark(args.clients, args.games, args.workers, args.seed))
+        print(f"{stats['games']} games in {stats['seconds']:.2f}s "
+              f"({stats['games_per_second']:.1f} games/s)")
+        print(f"{stats['requests']} requests, latency "
+              f"p50 {stats['latency_p50'] * 1000:.2f}ms, "
+              f"p99 {stats['latency_p99'] * 1000:.2f}ms")
+        print(f"Solved-position cache: {stats['cache_hits']} hits, "
+              f"{stats['cache_misses']} misses")
+
+
+if __name__ == "__main__":
+    main()
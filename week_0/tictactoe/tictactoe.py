@@ -3,18 +3,208 @@ Tic Tac Toe Player
 """
 
 import math
+import time
 from copy import deepcopy
+from functools import lru_cache
+
+import book
 
 X = "X"
 O = "O"
 EMPTY = None
 
+# Default number of marks in a row needed to win, when a call does not give
+# one; None means the full width of the board.
+win_length = None
+
+# Positions with at most this many empty cells are searched to the end, larger
+# ones with iterative deepening under a time budget (seconds per move).
+FULL_SEARCH_CELLS = 9
+TIME_BUDGET = 1.0
+
+# Statistics of the last minimax call: nodes visited and beta cutoffs (prunings).
+search_stats = {"nodes": 0, "cutoffs": 0}
+
+# Move ordering state of the current minimax call: the best action found for
+# positions (kept between the iterations of iterative deepening) and up to two
+# killer moves, which caused a cutoff elsewhere, per number of empty cells.
+# Positions up to BEST_MOVE_PLIES moves from the root are always stored, deeper
+# ones only while there are fewer than BEST_MOVES_SIZE entries, so that long
+# searches on large boards do not grow the table without bound.
+BEST_MOVE_PLIES = 2
+BEST_MOVES_SIZE = 10000
+best_moves = {}
+killer_moves = {}
+
+
+class SearchTimeout(Exception):
+    """Raised inside the search when the time budget of a move runs out."""
 
-def initial_state():
+
+def initial_state(size=3):
     """
     Returns starting state of the board.
     """
-    return [[EMPTY, EMPTY, EMPTY], [EMPTY, EMPTY, EMPTY], [EMPTY, EMPTY, EMPTY]]
+    return [[EMPTY] * size for _ in range(size)]
+
+
+def get_win_length(board, length=None):
+    """
+    Returns the number of marks in a row needed to win on the board: length,
+    or the module's win_length if length is None.
+    """
+    return min(length or win_length or len(board), len(board))
+
+
+@lru_cache(maxsize=None)
+def lines(size, length):
+    """
+    Returns all rows, columns and diagonals of the given length on a size x size
+    board, each as a tuple of (i, j) coordinates.
+    """
+    all_lines = []
+    for i in range(size):
+        for j in range(size):
+            for di, dj in ((0, 1), (1, 0), (1, 1), (1, -1)):
+                end_i = i + (length - 1) * di
+                end_j = j + (length - 1) * dj
+                if 0 <= end_i < size and 0 <= end_j < size:
+                    all_lines.append(
+                        tuple((i + n * di, j + n * dj) for n in range(length))
+                    )
+    return all_lines
+
+
+@lru_cache(maxsize=None)
+def cell_lines(size, length):
+    """
+    Returns a size x size grid of the indices (into lines) of the lines through each cell.
+    """
+    grid = [[[] for _ in range(size)] for _ in range(size)]
+    for index, line in enumerate(lines(size, length)):
+        for i, j in line:
+            grid[i][j].append(index)
+    return grid
+
+
+@lru_cache(maxsize=None)
+def cell_keys(size):
+    """
+    Returns a size x size grid of what a mark on each cell adds to the key of
+    a GameState: the board read as a base 3 number, with 1 for X and 2 for O.
+    """
+    return [
+        [{X: 3 ** (i * size + j), O: 2 * 3 ** (i * size + j)} for j in range(size)]
+        for i in range(size)
+    ]
+
+
+class GameState():
+    """
+    A board that keeps the number of X and O marks on each of its lines up to
+    date as moves are made and taken back, so that detecting a win or a draw
+    after a move only touches the lines through the cell of that move.
+    It also keeps an integer key, which identifies the board.
+    """
+
+    def __init__(self, size=3, length=None):
+        self.board = initial_state(size)
+        self.size = size
+        self.length = get_win_length(self.board, length)
+        self.cell_lines = cell_lines(size, self.length)
+        self.cell_keys = cell_keys(size)
+        self.order = cell_order(size, self.length)
+        self.line_count = len(lines(size, self.length))
+        self.counts = {X: [0] * self.line_count, O: [0] * self.line_count}
+        self.moves = 0
+        self.winner = None
+        self.key = 0
+        # Made moves and the winner before each of them, for undo.
+        self.history = []
+        self.winners = []
+
+    @classmethod
+    def from_board(cls, board, length=None):
+        """
+        Returns the state of a (list of lists) board, which is copied.
+        """
+        state = cls(len(board), length)
+        for i, row in enumerate(board):
+            for j, field in enumerate(row):
+                if field != EMPTY:
+                    state.place((i, j), field)
+        state.history.clear()
+        state.winners.clear()
+        return state
+
+    def player(self):
+        return O if self.moves % 2 else X
+
+    def terminal(self):
+        return self.winner is not None or self.moves == self.size * self.size
+
+    def utility(self):
+        if self.winner == X:
+            return 1
+        elif self.winner == O:
+            return -1
+        else:
+            return 0
+
+    def make(self, action):
+        """
+        Makes the move (i, j) of the player who has the next turn.
+        """
+        if self.board[action[0]][action[1]] != EMPTY:
+            raise RuntimeError("Action not allowed")
+        self.place(action, self.player())
+
+    def place(self, action, mark):
+        i, j = action
+        self.history.append(action)
+        self.winners.append(self.winner)
+        self.board[i][j] = mark
+        self.moves += 1
+        self.key += self.cell_keys[i][j][mark]
+
+        counts = self.counts[mark]
+        for line in self.cell_lines[i][j]:
+            counts[line] += 1
+            if counts[line] == self.length and self.winner is None:
+                self.winner = mark
+
+    def undo(self):
+        """
+        Takes back the last move.
+        """
+        i, j = self.history.pop()
+        self.winner = self.winners.pop()
+        mark = self.board[i][j]
+        counts = self.counts[mark]
+        for line in self.cell_lines[i][j]:
+            counts[line] -= 1
+        self.board[i][j] = EMPTY
+        self.moves -= 1
+        self.key -= self.cell_keys[i][j][mark]
+
+    def ordered_moves(self, first=None, killers=()):
+        """
+        Yields the empty cells in search order: first, then the killers, then
+        the others, each group in the order of the state. The cells are not
+        copied, so nothing is allocated per move.
+        """
+        board = self.board
+        if first is not None and board[first[0]][first[1]] == EMPTY:
+            yield first
+        if killers:
+            for action in self.order:
+                i, j = action
+                if board[i][j] == EMPTY and action != first and action in killers:
+                    yield action
+        for action in self.order:
+            i, j = action
+            if board[i][j] == EMPTY and action != first and action not in killers:
+                yield action
 
 
 def player(board):
@@ -61,40 +251,16 @@ def result(board, action):
     return new_board
 
 
-def winner(board):
+def winner(board, win_length=None):
     """
     Returns the winner of the game, if there is one.
     """
 
-    # Check all rows for three O or X.
-    for row_under_test in board:
-        if is_same(row_under_test):
-            return row_under_test[0]
-
-    # Check all columns for three O or X.
-    for column in range(len(board)):
-        column_under_test = []
-        for row in range(len(board[0])):
-            column_under_test.append(board[row][column])
-
-        if is_same(column_under_test):
-            return column_under_test[0]
-
-    # Check one diagonal for three 0 or X.
-    diag_under_test = []
-    for coord in range(len(board)):
-        diag_under_test.append(board[coord][coord])
-
-    if is_same(diag_under_test):
-        return diag_under_test[0]
-
-    # Check the other diagonal for three 0 or X.
-    diag_under_test = []
-    for column in range(len(board)):
-        diag_under_test.append(board[len(board) - column - 1][column])
-
-    if is_same(diag_under_test):
-        return diag_under_test[0]
+    # Check all rows, columns and diagonals of the winning length for only O or X.
+    for line in lines(len(board), get_win_length(board, win_length)):
+        line_under_test = [board[i][j] for i, j in line]
+        if is_same(line_under_test):
+            return line_under_test[0]
 
     return None
 
@@ -109,12 +275,12 @@ def is_same(list):
         return False
 
 
-def terminal(board):
+def terminal(board, win_length=None):
     """
     Returns True if game is over, False otherwise.
     """
     # Check if any player has won the game.
-    if winner(board):
+    if winner(board, win_length):
         return True
 
     # Since no player has won the game, if any of the spaces are still empty, the game is not over
@@ -127,11 +293,11 @@ def terminal(board):
     return True
 
 
-def utility(board):
+def utility(board, win_length=None):
     """
     Returns 1 if X has won the game, -1 if O has won, 0 otherwise.
     """
-    winning_player = winner(board)
+    winning_player = winner(board, win_length)
 
     if winning_player == X:
         return 1
@@ -141,66 +307,236 @@ def utility(board):
         return 0
 
 
-def minimax(board):
+def evaluate(state):
+    """
+    Returns a heuristic value of a non-terminal GameState, strictly between -1 and 1
+    (the utilities of lost and won games). Lines still open for only one of
+    the players count for that player, quadratically in the marks placed.
+    """
+    score = 0
+
+    for x_count, o_count in zip(state.counts[X], state.counts[O]):
+        if not o_count:
+            score += x_count * x_count
+        elif not x_count:
+            score -= o_count * o_count
+
+    return 0.9 * score / (state.line_count * state.length * state.length)
+
+
+def minimax(board, time_budget=None, use_book=True, win_length=None):
+    """
+    Returns the optimal action for the current player on the board, where
+    win_length marks in a row win (by default the module's win_length).
+
+    Positions with more than FULL_SEARCH_CELLS empty cells, or any position when
+    time_budget is given, are searched with iterative deepening: the depth limit
+    grows until the search reaches the end of the game or the time budget
+    (TIME_BUDGET seconds by default) runs out, and the action of the deepest
+    completed search is returned.
+
+    Positions of the classic 3x3 game are looked up in the opening book first,
+    unless use_book is False.
+    Statistics of the search are left in search_stats.
+    """
+    reset_search()
+    length = get_win_length(board, win_length)
+
+    if use_book and len(board) == 3 and length == 3:
+        action = book.lookup(board)
+        if action is not None:
+            return action
+
+    empty_cells = len(actions(board))
+    if time_budget is None and empty_cells <= FULL_SEARCH_CELLS:
+        return search(board, -math.inf, math.inf, None, None, length)[1]
+
+    deadline = time.perf_counter() + (time_budget or TIME_BUDGET)
+    best_action = None
+    for depth in range(1, empty_cells + 1):
+        try:
+            best_action = search(board, -math.inf, math.inf, depth, deadline, length)[1]
+        except SearchTimeout:
+            break
+
+    # If not even the first depth completed, play the first move in order.
+    if best_action is None and empty_cells:
+        best_action = ordered_actions(board, length)[0]
+
+    return best_action
+
+
+def reset_search():
+    """
+    Clears the search statistics and the move ordering state.
+    """
+    search_stats["nodes"] = 0
+    search_stats["cutoffs"] = 0
+    best_moves.clear()
+    killer_moves.clear()
+
+
+@lru_cache(maxsize=None)
+def cell_weights(size, length):
+    """
+    Returns a size x size grid of the number of winning lines through each cell.
+    On the 3x3 board the center lies on 4 lines, the corners on 3 and the edges on 2.
+    """
+    weights = [[0] * size for _ in range(size)]
+    for line in lines(size, length):
+        for i, j in line:
+            weights[i][j] += 1
+    return weights
+
+
+@lru_cache(maxsize=None)
+def cell_order(size, length):
+    """
+    Returns all cells, those on the most winning lines first. Ties are broken by
+    position, so the order (and the chosen action) is reproducible.
+    """
+    weights = cell_weights(size, length)
+    cells = [(i, j) for i in range(size) for j in range(size)]
+    return tuple(sorted(cells, key=lambda cell: (-weights[cell[0]][cell[1]], cell)))
+
+
+def ordered_moves(state):
+    """
+    Yields the possible actions of a GameState in the order they should be
+    searched: the best action previously found for the state, then the killer
+    moves, then the cells on the most winning lines first.
+    """
+    empty_cells = state.size * state.size - state.moves
+    return state.ordered_moves(best_moves.get(state.key), killer_moves.get(empty_cells, ()))
+
+
+def ordered_actions(board, length=None):
     """
-    Returns the optimal action for the current player on the board.
+    Returns the possible actions on the board in the order they should be searched.
     """
+    return list(ordered_moves(GameState.from_board(board, length)))
+
+
+def board_key(board):
+    return tuple(tuple(row) for row in board)
+
+
+def record_cutoff(state, action):
+    """
+    Counts a beta cutoff caused by the action and keeps it as a killer move.
+    """
+    search_stats["cutoffs"] += 1
+    empty_cells = state.size * state.size - state.moves
+    killers = killer_moves.setdefault(empty_cells, [])
+    if action not in killers:
+        killers.insert(0, action)
+        del killers[2:]
+
+
+def search(board, alpha, beta, depth, deadline, length=None):
+    """
+    Searches the board for the player to move, on a GameState copy of it.
+    """
+    state = GameState.from_board(board, length)
+
     # The X player optimizes for maximized utility, while the O player optimizes for the minimal.
-    if player(board) == X:
-        return max_value(board, -math.inf, math.inf)[1]
+    if state.player() == X:
+        return max_value(state, alpha, beta, depth, deadline)
     else:
-        return min_value(board, -math.inf, math.inf)[1]
+        return min_value(state, alpha, beta, depth, deadline)
+
+
+def cutoff(state, depth, deadline):
+    """
+    Returns the value of the state if the search stops at it, None otherwise.
+    Raises SearchTimeout if the deadline has passed.
+    """
+    if state.terminal():
+        return state.utility()
+    if depth == 0:
+        return evaluate(state)
+    if deadline is not None and time.perf_counter() > deadline:
+        raise SearchTimeout
+    return None
 
 
-def max_value(board, alpha, beta):
+def max_value(state, alpha, beta, depth=None, deadline=None):
     """
     Return the action that produces the highest value of min_value (the opponents optimization)
     Also return the calculated utility of that action, in order to use it in the recursive function.
     Alpha-beta pruning is performed to optimize the algorithm.
+    The search stops at the given depth (None for no limit) with a heuristic value.
+    Moves are made and taken back on the GameState in place, it is unchanged on return.
     """
-    if terminal(board):
-        return (utility(board), None)
+    search_stats["nodes"] += 1
+    value = cutoff(state, depth, deadline)
+    if value is not None:
+        return (value, None)
 
     v = -math.inf
     optimal_action = None
-
-    for action in actions(board):
-        result_v = min_value(result(board, action), alpha, beta)[0]
+    next_depth = None if depth is None else depth - 1
+
+    for action in ordered_moves(state):
+        # Make the move on the state itself and take it back after the search.
+        state.make(action)
+        try:
+            result_v = min_value(state, alpha, beta, next_depth, deadline)[0]
+        finally:
+            state.undo()
         if result_v > v:
             v = result_v
             optimal_action = action
 
         if v >= beta:
-            return (v, optimal_action)
+            record_cutoff(state, action)
+            break
 
         if v > alpha:
             alpha = v
 
+    # The history of the state holds the moves made since the root of the search.
+    if len(state.history) <= BEST_MOVE_PLIES or len(best_moves) < BEST_MOVES_SIZE:
+        best_moves[state.key] = optimal_action
     return (v, optimal_action)
 
 
-def min_value(board, alpha, beta):
+def min_value(state, alpha, beta, depth=None, deadline=None):
     """
     Return the action that produces the lowest value of max_value (the opponents optimization)
     Also return the calculated utility of that action, in order to use it in the recursive function.
     Alpha-beta pruning is performed to optimize the algorithm.
+    The search stops at the given depth (None for no limit) with a heuristic value.
+    Moves are made and taken back on the GameState in place, it is unchanged on return.
     """
-    if terminal(board):
-        return (utility(board), None)
+    search_stats["nodes"] += 1
+    value = cutoff(state, depth, deadline)
+    if value is not None:
+        return (value, None)
 
     v = math.inf
     optimal_action = None
-
-    for action in actions(board):
-        result_v = max_value(result(board, action), alpha, beta)[0]
+    next_depth = None if depth is None else depth - 1
+
+    for action in ordered_moves(state):
+        # Make the move on the state itself and take it back after the search.
+        state.make(action)
+        try:
+            result_v = max_value(state, alpha, beta, next_depth, deadline)[0]
+        finally:
+            state.undo()
         if result_v < v:
             v = result_v
             optimal_action = action
 
         if v <= alpha:
-            return (v, optimal_action)
+            record_cutoff(state, action)
+            break
 
         if v < beta:
             beta = v
 
+    # The history of the state holds the moves made since the root of the search.
+    if len(state.history) <= BEST_MOVE_PLIES or len(best_moves) < BEST_MOVES_SIZE:
+        best_moves[state.key] = optimal_action
     return (v, optimal_action)
@@ -1,7 +1,48 @@
 import itertools
+import multiprocessing
+import operator
+import weakref
+
+# Table of the sentences in use, so that building an equal sentence again
+# returns the existing one. Sentences are keyed by their class and their
+# parts (the ids of their subsentences, which they keep alive).
+interned = weakref.WeakValueDictionary()
 
 
 class Sentence():
+    """
+    Sentences other than And are immutable and hash-consed: equal sentences
+    are built only once. Their hash and set of symbols are cached, unless an
+    And is part of them, as add can extend it afterwards.
+    """
+
+    __slots__ = ("_hash", "_symbols", "__weakref__")
+
+    def __hash__(self):
+        if self._hash is None:
+            if self._symbols is None:
+                # Not cached, the sentence may still change.
+                return self.compute_hash()
+            self._hash = self.compute_hash()
+        return self._hash
+
+    def compute_hash(self):
+        """Returns the structural hash of the logical sentence."""
+        raise Exception("nothing to hash")
+
+    def compute_symbols(self):
+        """Returns a frozenset of all symbols in the logical sentence."""
+        return frozenset()
+
+    def symbol_set(self):
+        """Returns a frozenset of all symbols, cached when it cannot change."""
+        if self._symbols is None:
+            return self.compute_symbols()
+        return self._symbols
+
+    def immutable(self):
+        """Checks if the logical sentence can never change."""
+        return self._symbols is not None and not isinstance(self, And)
 
     def evaluate(self, model):
         """Evaluates the logical sentence."""
@@ -11,9 +52,45 @@ class Sentence():
         """Returns string formula representing logical sentence."""
         return ""
 
+    def evaluate_bits(self, columns, mask):
+        """
+        Evaluates the logical sentence in many models at once. Every model is a
+        bit position: columns maps each symbol to an integer whose bits are the
+        symbol's values, and mask has a bit set for every model.
+        """
+        raise Exception("nothing to evaluate")
+
+    def expression(self, index):
+        """
+        Returns a Python expression evaluating the logical sentence in a model
+        list v, index mapping each symbol to its position in the list.
+        """
+        raise Exception("nothing to evaluate")
+
+    def closure(self, index):
+        """
+        Returns a function evaluating the logical sentence in a model list, as
+        nested closures over the positions of the symbols.
+        """
+        raise Exception("nothing to evaluate")
+
+    def compile(self, index):
+        """
+        Compiles the logical sentence into a function of a model list (of
+        booleans, in the positions given by index), so evaluating it neither
+        walks the sentence objects nor looks symbols up by name.
+
+        The function is a single Python expression, or nested closures when the
+        sentence is nested too deeply for the Python parser.
+        """
+        try:
+            return eval(f"lambda v: {self.expression(index)}")
+        except (SyntaxError, RecursionError, MemoryError):
+            return self.closure(index)
+
     def symbols(self):
         """Returns a set of all symbols in the logical sentence."""
-        return set()
+        return set(self.symbol_set())
 
     @classmethod
     def validate(cls, sentence):
@@ -44,15 +121,32 @@ class Sentence():
 
 class Symbol(Sentence):
 
-    def __init__(self, name):
-        self.name = name
+    __slots__ = ("name",)
+
+    def __new__(cls, name):
+        key = (cls, name)
+        sentence = interned.get(key)
+        if sentence is None:
+            sentence = interned[key] = object.__new__(cls)
+            sentence.name = name
+            sentence._hash = None
+            sentence._symbols = frozenset((name,))
+        return sentence
+
+    def __reduce__(self):
+        return (type(self), (self.name,))
 
     def __eq__(self, other):
         return isinstance(other, Symbol) and self.name == other.name
 
-    def __hash__(self):
+    __hash__ = Sentence.__hash__
+
+    def compute_hash(self):
         return hash(("symbol", self.name))
 
+    def compute_symbols(self):
+        return frozenset((self.name,))
+
     def __repr__(self):
         return self.name
 
@@ -62,51 +156,115 @@ class Symbol(Sentence):
         except KeyError:
             raise Exception(f"variable {self.name} not in model")
 
+    def evaluate_bits(self, columns, mask):
+        try:
+            return columns[self.name]
+        except KeyError:
+            raise Exception(f"variable {self.name} not in model")
+
+    def expression(self, index):
+        try:
+            return f"v[{index[self.name]}]"
+        except KeyError:
+            raise Exception(f"variable {self.name} not in model")
+
+    def closure(self, index):
+        try:
+            return operator.itemgetter(index[self.name])
+        except KeyError:
+            raise Exception(f"variable {self.name} not in model")
+
     def formula(self):
         return self.name
 
-    def symbols(self):
-        return {self.name}
-
 
 class Not(Sentence):
-    def __init__(self, operand):
+
+    __slots__ = ("operand",)
+
+    def __new__(cls, operand):
         Sentence.validate(operand)
-        self.operand = operand
+        key = (cls, id(operand))
+        sentence = interned.get(key)
+        if sentence is None:
+            sentence = interned[key] = object.__new__(cls)
+            sentence.operand = operand
+            sentence._hash = None
+            sentence._symbols = (
+                sentence.compute_symbols() if operand.immutable() else None
+            )
+        return sentence
+
+    def __reduce__(self):
+        return (type(self), (self.operand,))
 
     def __eq__(self, other):
         return isinstance(other, Not) and self.operand == other.operand
 
-    def __hash__(self):
+    __hash__ = Sentence.__hash__
+
+    def compute_hash(self):
         return hash(("not", hash(self.operand)))
 
+    def compute_symbols(self):
+        return self.operand.symbol_set()
+
     def __repr__(self):
         return f"Not({self.operand})"
 
     def evaluate(self, model):
         return not self.operand.evaluate(model)
 
+    def evaluate_bits(self, columns, mask):
+        return mask & ~self.operand.evaluate_bits(columns, mask)
+
+    def expression(self, index):
+        return f"(not {self.operand.expression(index)})"
+
+    def closure(self, index):
+        operand = self.operand.closure(index)
+        return lambda v: not operand(v)
+
     def formula(self):
         return "¬" + Sentence.parenthesize(self.operand.formula())
 
-    def symbols(self):
-        return self.operand.symbols()
-
 
 class And(Sentence):
+    """
+    Conjunctions can be extended with add, so they are not hash-consed, and
+    sentences containing them compute their hash and symbols on every call.
+    """
+
+    __slots__ = ("conjuncts",)
+
     def __init__(self, *conjuncts):
         for conjunct in conjuncts:
             Sentence.validate(conjunct)
         self.conjuncts = list(conjuncts)
+        self._hash = None
+        self._symbols = (
+            self.compute_symbols()
+            if all(conjunct.immutable() for conjunct in conjuncts) else None
+        )
+
+    def __reduce__(self):
+        return (type(self), tuple(self.conjuncts))
 
     def __eq__(self, other):
         return isinstance(other, And) and self.conjuncts == other.conjuncts
 
-    def __hash__(self):
+    __hash__ = Sentence.__hash__
+
+    def compute_hash(self):
         return hash(
             ("and", tuple(hash(conjunct) for conjunct in self.conjuncts))
         )
 
+    def compute_symbols(self):
+        return frozenset().union(
+            *[conjunct.symbol_set() for conjunct in self.conjuncts]
+        )
+
     def __repr__(self):
         conjunctions = ", ".join(
             [str(conjunct) for conjunct in self.conjuncts]
@@ -116,34 +274,89 @@ class And(Sentence):
     def add(self, conjunct):
         Sentence.validate(conjunct)
         self.conjuncts.append(conjunct)
+        self._hash = None
+        if self._symbols is not None and conjunct.immutable():
+            self._symbols = self._symbols.union(conjunct.symbol_set())
+        else:
+            self._symbols = None
 
     def evaluate(self, model):
         return all(conjunct.evaluate(model) for conjunct in self.conjuncts)
 
+    def evaluate_bits(self, columns, mask):
+        bits = mask
+        for conjunct in self.conjuncts:
+            bits &= conjunct.evaluate_bits(columns, mask)
+            if not bits:
+                break
+        return bits
+
+    def expression(self, index):
+        if not self.conjuncts:
+            return "True"
+        return "(" + " and ".join(
+            [conjunct.expression(index) for conjunct in self.conjuncts]
+        ) + ")"
+
+    def closure(self, index):
+        conjuncts = [conjunct.closure(index) for conjunct in self.conjuncts]
+        if len(conjuncts) == 1:
+            return conjuncts[0]
+        if len(conjuncts) == 2:
+            first, second = conjuncts
+            return lambda v: first(v) and second(v)
+
+        def conjunction(v):
+            for conjunct in conjuncts:
+                if not conjunct(v):
+                    return False
+            return True
+        return conjunction
+
     def formula(self):
         if len(self.conjuncts) == 1:
             return self.conjuncts[0].formula()
         return " ∧ ".join([Sentence.parenthesize(conjunct.formula())
                            for conjunct in self.conjuncts])
 
-    def symbols(self):
-        return set.union(*[conjunct.symbols() for conjunct in self.conjuncts])
-
 
 class Or(Sentence):
-    def __init__(self, *disjuncts):
+
+    __slots__ = ("disjuncts",)
+
+    def __new__(cls, *disjuncts):
         for disjunct in disjuncts:
             Sentence.validate(disjunct)
-        self.disjuncts = list(disjuncts)
+        key = (cls, *[id(disjunct) for disjunct in disjuncts])
+        sentence = interned.get(key)
+        if sentence is None:
+            sentence = interned[key] = object.__new__(cls)
+            sentence.disjuncts = disjuncts
+            sentence._hash = None
+            sentence._symbols = (
+                sentence.compute_symbols()
+                if all(disjunct.immutable() for disjunct in disjuncts) else None
+            )
+        return sentence
+
+    def __reduce__(self):
+        return (type(self), self.disjuncts)
 
     def __eq__(self, other):
         return isinstance(other, Or) and self.disjuncts == other.disjuncts
 
-    def __hash__(self):
+    __hash__ = Sentence.__hash__
+
+    def compute_hash(self):
         return hash(
             ("or", tuple(hash(disjunct) for disjunct in self.disjuncts))
         )
 
+    def compute_symbols(self):
+        return frozenset().union(
+            *[disjunct.symbol_set() for disjunct in self.disjuncts]
+        )
+
     def __repr__(self):
         disjuncts = ", ".join([str(disjunct) for disjunct in self.disjuncts])
         return f"Or({disjuncts})"
@@ -151,31 +364,79 @@ class Or(Sentence):
     def evaluate(self, model):
         return any(disjunct.evaluate(model) for disjunct in self.disjuncts)
 
+    def evaluate_bits(self, columns, mask):
+        bits = 0
+        for disjunct in self.disjuncts:
+            bits |= disjunct.evaluate_bits(columns, mask)
+            if bits == mask:
+                break
+        return bits
+
+    def expression(self, index):
+        if not self.disjuncts:
+            return "False"
+        return "(" + " or ".join(
+            [disjunct.expression(index) for disjunct in self.disjuncts]
+        ) + ")"
+
+    def closure(self, index):
+        disjuncts = [disjunct.closure(index) for disjunct in self.disjuncts]
+        if len(disjuncts) == 1:
+            return disjuncts[0]
+        if len(disjuncts) == 2:
+            first, second = disjuncts
+            return lambda v: first(v) or second(v)
+
+        def disjunction(v):
+            for disjunct in disjuncts:
+                if disjunct(v):
+                    return True
+            return False
+        return disjunction
+
     def formula(self):
         if len(self.disjuncts) == 1:
             return self.disjuncts[0].formula()
         return " ∨  ".join([Sentence.parenthesize(disjunct.formula())
                             for disjunct in self.disjuncts])
 
-    def symbols(self):
-        return set.union(*[disjunct.symbols() for disjunct in self.disjuncts])
-
 
 class Implication(Sentence):
-    def __init__(self, antecedent, consequent):
+
+    __slots__ = ("antecedent", "consequent")
+
+    def __new__(cls, antecedent, consequent):
         Sentence.validate(antecedent)
         Sentence.validate(consequent)
-        self.antecedent = antecedent
-        self.consequent = consequent
+        key = (cls, id(antecedent), id(consequent))
+        sentence = interned.get(key)
+        if sentence is None:
+            sentence = interned[key] = object.__new__(cls)
+            sentence.antecedent = antecedent
+            sentence.consequent = consequent
+            sentence._hash = None
+            sentence._symbols = (
+                sentence.compute_symbols()
+                if antecedent.immutable() and consequent.immutable() else None
+            )
+        return sentence
+
+    def __reduce__(self):
+        return (type(self), (self.antecedent, self.consequent))
 
     def __eq__(self, other):
         return (isinstance(other, Implication)
                 and self.antecedent == other.antecedent
                 and self.consequent == other.consequent)
 
-    def __hash__(self):
+    __hash__ = Sentence.__hash__
+
+    def compute_hash(self):
         return hash(("implies", hash(self.antecedent), hash(self.consequent)))
 
+    def compute_symbols(self):
+        return self.antecedent.symbol_set() | self.consequent.symbol_set()
+
     def __repr__(self):
         return f"Implication({self.antecedent}, {self.consequent})"
 
@@ -183,30 +444,61 @@ class Implication(Sentence):
         return ((not self.antecedent.evaluate(model))
                 or self.consequent.evaluate(model))
 
+    def evaluate_bits(self, columns, mask):
+        return ((mask & ~self.antecedent.evaluate_bits(columns, mask))
+                | self.consequent.evaluate_bits(columns, mask))
+
+    def expression(self, index):
+        return (f"(not {self.antecedent.expression(index)}"
+                f" or {self.consequent.expression(index)})")
+
+    def closure(self, index):
+        antecedent = self.antecedent.closure(index)
+        consequent = self.consequent.closure(index)
+        return lambda v: not antecedent(v) or consequent(v)
+
     def formula(self):
         antecedent = Sentence.parenthesize(self.antecedent.formula())
         consequent = Sentence.parenthesize(self.consequent.formula())
         return f"{antecedent} => {consequent}"
 
-    def symbols(self):
-        return set.union(self.antecedent.symbols(), self.consequent.symbols())
-
 
 class Biconditional(Sentence):
-    def __init__(self, left, right):
+
+    __slots__ = ("left", "right")
+
+    def __new__(cls, left, right):
         Sentence.validate(left)
         Sentence.validate(right)
-        self.left = left
-        self.right = right
+        key = (cls, id(left), id(right))
+        sentence = interned.get(key)
+        if sentence is None:
+            sentence = interned[key] = object.__new__(cls)
+            sentence.left = left
+            sentence.right = right
+            sentence._hash = None
+            sentence._symbols = (
+                sentence.compute_symbols()
+                if left.immutable() and right.immutable() else None
+            )
+        return sentence
+
+    def __reduce__(self):
+        return (type(self), (self.left, self.right))
 
     def __eq__(self, other):
         return (isinstance(other, Biconditional)
                 and self.left == other.left
                 and self.right == other.right)
 
-    def __hash__(self):
+    __hash__ = Sentence.__hash__
+
+    def compute_hash(self):
         return hash(("biconditional", hash(self.left), hash(self.right)))
 
+    def compute_symbols(self):
+        return self.left.symbol_set() | self.right.symbol_set()
+
     def __repr__(self):
         return f"Biconditional({self.left}, {self.right})"
 
@@ -216,14 +508,24 @@ class Biconditional(Sentence):
                 or (not self.left.evaluate(model)
                     and not self.right.evaluate(model)))
 
+    def evaluate_bits(self, columns, mask):
+        return mask & ~(self.left.evaluate_bits(columns, mask)
+                        ^ self.right.evaluate_bits(columns, mask))
+
+    def expression(self, index):
+        return (f"({self.left.expression(index)}"
+                f" == {self.right.expression(index)})")
+
+    def closure(self, index):
+        left = self.left.closure(index)
+        right = self.right.closure(index)
+        return lambda v: left(v) == right(v)
+
     def formula(self):
         left = Sentence.parenthesize(str(self.left))
         right = Sentence.parenthesize(str(self.right))
         return f"{left} <=> {right}"
 
-    def symbols(self):
-        return set.union(self.left.symbols(), self.right.symbols())
-
 
 def model_check(knowledge, query):
     """Checks if knowledge base entails query."""
@@ -235,29 +537,125 @@ def model_check(knowledge, query):
         if not symbols:
 
             # If knowledge base is true in model, then query must also be true
-            if knowledge.evaluate(model):
-                return query.evaluate(model)
+            if knowledge(model):
+                return query(model)
             return True
         else:
 
             # Choose one of the remaining unused symbols
-            remaining = symbols.copy()
-            p = remaining.pop()
+            p = symbols - 1
 
-            # Create a model where the symbol is true
-            model_true = model.copy()
-            model_true[p] = True
-
-            # Create a model where the symbol is false
-            model_false = model.copy()
-            model_false[p] = False
+            # Set the symbol to true, then to false, in the same model list
+            model[p] = True
+            if not check_all(knowledge, query, p, model):
+                return False
+            model[p] = False
 
             # Ensure entailment holds in both models
-            return (check_all(knowledge, query, remaining, model_true) and
-                    check_all(knowledge, query, remaining, model_false))
+            return check_all(knowledge, query, p, model)
 
     # Get all symbols in both knowledge and query
     symbols = set.union(knowledge.symbols(), query.symbols())
 
+    # Compile both sentences over a model list indexed by symbol
+    index = {symbol: i for i, symbol in enumerate(sorted(symbols))}
+    knowledge = knowledge.compile(index)
+    query = query.compile(index)
+
     # Check that knowledge entails query
-    return check_all(knowledge, query, symbols, dict())
+    return check_all(knowledge, query, len(symbols), [False] * len(symbols))
+
+
+def model_check_vectorized(knowledge, query, chunk_symbols=16):
+    """
+    Checks if knowledge base entails query, like model_check, but evaluates
+    2 ** chunk_symbols models at once, with each model being one bit of
+    (arbitrary precision) integers, so the bitwise operators evaluate a
+    sentence in all models of a chunk together.
+    """
+
+    # Get all symbols in both knowledge and query
+    symbols = sorted(set.union(knowledge.symbols(), query.symbols()))
+
+    # The first symbols vary within a chunk, the others are fixed per chunk.
+    inner = symbols[:chunk_symbols]
+    outer = symbols[chunk_symbols:]
+    size = 2 ** len(inner)
+    mask = (1 << size) - 1
+
+    # Bit m of the column of the i-th inner symbol is bit i of m: a pattern of
+    # 2 ** i zeros followed by 2 ** i ones, repeated over the whole chunk.
+    columns = {}
+    for i, symbol in enumerate(inner):
+        period = 2 ** (i + 1)
+        block = ((1 << 2 ** i) - 1) << 2 ** i
+        columns[symbol] = block * (mask // ((1 << period) - 1))
+
+    for chunk in range(2 ** len(outer)):
+        for i, symbol in enumerate(outer):
+            columns[symbol] = mask if chunk >> i & 1 else 0
+
+        # In every model where the knowledge base is true, the query must be too.
+        knowledge_bits = knowledge.evaluate_bits(columns, mask)
+        if knowledge_bits & ~query.evaluate_bits(columns, mask):
+            return False
+
+    return True
+
+
+# Compiled sentences of a model_check_parallel worker process.
+worker_state = None
+
+
+def init_worker(knowledge, query, symbols, fixed):
+    global worker_state
+    index = {symbol: i for i, symbol in enumerate(symbols)}
+    worker_state = (knowledge.compile(index), query.compile(index), len(symbols), fixed)
+
+
+def check_subtree(prefix):
+    """
+    Checks entailment in the models whose last fixed symbols are set to the
+    bits of prefix, enumerating the remaining symbols.
+    """
+    knowledge, query, count, fixed = worker_state
+    free = count - fixed
+    model = [False] * count
+    for i in range(fixed):
+        model[free + i] = bool(prefix >> i & 1)
+
+    for values in itertools.product((True, False), repeat=free):
+        model[:free] = values
+        if knowledge(model) and not query(model):
+            return False
+    return True
+
+
+def model_check_parallel(knowledge, query, workers=None, split_symbols=None):
+    """
+    Checks if knowledge base entails query, like model_check, with the models
+    split into 2 ** split_symbols subtrees (by fixing that many symbols) that
+    are checked by a pool of worker processes. Stops all workers as soon as
+    one of them finds a model where the knowledge base is true but the query
+    is not.
+    """
+
+    # Get all symbols in both knowledge and query
+    symbols = sorted(set.union(knowledge.symbols(), query.symbols()))
+
+    # By default, make a few times more subtrees than workers, to balance them.
+    workers = workers or multiprocessing.cpu_count()
+    if split_symbols is None:
+        split_symbols = (4 * workers - 1).bit_length()
+    fixed = min(split_symbols, len(symbols))
+
+    with multiprocessing.Pool(
+        workers, init_worker, (knowledge, query, symbols, fixed)
+    ) as pool:
+        # Like model_check, start with the models where the symbols are true.
+        prefixes = range(2 ** fixed - 1, -1, -1)
+        for entailed in pool.imap_unordered(check_subtree, prefixes):
+            if not entailed:
+                # Leaving the with block terminates the remaining workers.
+                return False
+    return True
@@ -0,0 +1,433 @@
+"""
+SAT based entailment for logic sentences
+
+Sentences are converted to conjunctive normal form with the Tseitin
+transformation (every compound subsentence gets a new variable defined by a
+few clauses, so the CNF grows linearly instead of exponentially), and checked
+with a CDCL solver: unit propagation with two watched literals per clause,
+learning of 1-UIP conflict clauses, non-chronological backjumping and
+activity based decisions.
+
+A knowledge base entails a query when the knowledge base together with the
+negation of the query is unsatisfiable.
+"""
+
+import heapq
+
+from logic import Sentence, Symbol, Not, And, Or, Implication, Biconditional
+
+
+class Solver():
+    """
+    CDCL SAT solver. Variables are positive integers, literals are variables
+    (true) or their negations (false), as in the DIMACS format.
+    """
+
+    def __init__(self):
+        self.clauses = []
+        # Literal -> indices of the clauses watching it (it is one of their first two).
+        self.watches = {}
+        self.variable_count = 0
+
+        # Per variable (index 0 unused): value, decision level and the index
+        # of the clause that implied it (None for decisions).
+        self.values = [None]
+        self.levels = [0]
+        self.reasons = [None]
+        self.activity = [0.0]
+        self.phase = [False]
+
+        self.trail = []
+        self.trail_limits = []
+        self.propagated = 0
+
+        self.increment = 1.0
+        self.heap = []
+        # False once the clauses are unsatisfiable without any assumptions.
+        self.ok = True
+        self.model = None
+
+    def new_variable(self):
+        self.variable_count += 1
+        v = self.variable_count
+        for array, initial in ((self.values, None), (self.levels, 0),
+                               (self.reasons, None), (self.activity, 0.0),
+                               (self.phase, False)):
+            array.append(initial)
+        self.watches[v] = []
+        self.watches[-v] = []
+        heapq.heappush(self.heap, (0.0, v))
+        return v
+
+    def value(self, literal):
+        """Returns the value of a literal, None if its variable is unassigned."""
+        value = self.values[abs(literal)]
+        if value is None:
+            return None
+        return value if literal > 0 else not value
+
+    def add_clause(self, literals):
+        """
+        Adds a clause (a list of literals). Returns False if the clauses became
+        unsatisfiable.
+        """
+        if not self.ok:
+            return False
+        self.backtrack(0)
+
+        clause = []
+        for literal in literals:
+            value = self.value(literal)
+            if value is True or -literal in clause:
+                # Satisfied at level 0, or a tautology.
+                return True
+            if value is None and literal not in clause:
+                clause.append(literal)
+
+        if not clause:
+            self.ok = False
+        elif len(clause) == 1:
+            self.assign(clause[0], None)
+            self.ok = self.propagate() is None
+        else:
+            self.attach(clause)
+        return self.ok
+
+    def attach(self, clause):
+        index = len(self.clauses)
+        self.clauses.append(clause)
+        self.watches[clause[0]].append(index)
+        self.watches[clause[1]].append(index)
+        return index
+
+    def assign(self, literal, reason):
+        v = abs(literal)
+        self.values[v] = literal > 0
+        self.levels[v] = len(self.trail_limits)
+        self.reasons[v] = reason
+        self.trail.append(literal)
+
+    def propagate(self):
+        """
+        Unit propagation over the watched literals. Returns the index of a
+        conflicting clause, or None.
+        """
+        while self.propagated < len(self.trail):
+            false_literal = -self.trail[self.propagated]
+            self.propagated += 1
+
+            watching = self.watches[false_literal]
+            kept = []
+            conflict = None
+            for n, index in enumerate(watching):
+                clause = self.clauses[index]
+
+                # Keep the false literal in the second position.
+                if clause[0] == false_literal:
+                    clause[0], clause[1] = clause[1], clause[0]
+
+                if self.value(clause[0]) is True:
+                    kept.append(index)
+                    continue
+
+                # Look for another literal that is not false to watch instead.
+                for k in range(2, len(clause)):
+                    if self.value(clause[k]) is not False:
+                        clause[1], clause[k] = clause[k], clause[1]
+                        self.watches[clause[1]].append(index)
+                        break
+                else:
+                    kept.append(index)
+                    if self.value(clause[0]) is False:
+                        conflict = index
+                        kept.extend(watching[n + 1:])
+                        break
+                    self.assign(clause[0], index)
+
+            self.watches[false_literal] = kept
+            if conflict is not None:
+                return conflict
+
+        return None
+
+    def analyze(self, conflict):
+        """
+        Derives the 1-UIP learnt clause of a conflict. Returns the clause, with
+        the asserting literal first, and the level to backjump to.
+        """
+        level = len(self.trail_limits)
+        seen = set()
+        learnt = [None]
+        pending = 0
+        literal = None
+        position = len(self.trail) - 1
+        clause = self.clauses[conflict]
+
+        while True:
+            # The first literal of a reason clause is the one it implied.
+            for q in (clause if literal is None else clause[1:]):
+                v = abs(q)
+                if v in seen or self.levels[v] == 0:
+                    continue
+                seen.add(v)
+                self.bump(v)
+                if self.levels[v] == level:
+                    pending += 1
+                else:
+                    learnt.append(q)
+
+            # Continue with the most recent assignment involved in the conflict.
+            while abs(self.trail[position]) not in seen:
+                position -= 1
+            literal = self.trail[position]
+            position -= 1
+            pending -= 1
+            if pending == 0:
+                break
+            clause = self.clauses[self.reasons[abs(literal)]]
+
+        learnt[0] = -literal
+
+        # Watch the literal of the highest remaining level second, it is the
+        # first one to become unassigned when backtracking further.
+        backjump = 0
+        if len(learnt) > 1:
+            highest = max(range(1, len(learnt)), key=lambda i: self.levels[abs(learnt[i])])
+            learnt[1], learnt[highest] = learnt[highest], learnt[1]
+            backjump = self.levels[abs(learnt[1])]
+
+        self.increment *= 1.05
+        return learnt, backjump
+
+    def bump(self, v):
+        self.activity[v] += self.increment
+        if self.activity[v] > 1e100:
+            # Rescale all activities before they overflow.
+            self.activity = [a * 1e-100 for a in self.activity]
+            self.increment *= 1e-100
+            self.heap = [(-self.activity[u], u) for u in range(1, self.variable_count + 1)]
+            heapq.heapify(self.heap)
+        else:
+            heapq.heappush(self.heap, (-self.activity[v], v))
+
+    def backtrack(self, level):
+        if len(self.trail_limits) <= level:
+            return
+        for literal in self.trail[self.trail_limits[level]:]:
+            v = abs(literal)
+            self.phase[v] = self.values[v]
+            self.values[v] = None
+            self.reasons[v] = None
+            heapq.heappush(self.heap, (-self.activity[v], v))
+        del self.trail[self.trail_limits[level]:]
+        del self.trail_limits[level:]
+        self.propagated = len(self.trail)
+
+    def pick_branch(self):
+        """Returns the unassigned variable with the highest activity, or None."""
+        while self.heap:
+            activity, v = heapq.heappop(self.heap)
+            if self.values[v] is None and -activity == self.activity[v]:
+                return v
+        return None
+
+    def solve(self, assumptions=()):
+        """
+        Returns True if the clauses are satisfiable with the assumption literals
+        true, and stores the satisfying assignment in model. Clauses learnt
+        under assumptions stay valid, so the solver can be reused incrementally.
+        """
+        self.model = None
+        if not self.ok:
+            return False
+        self.backtrack(0)
+        if self.propagate() is not None:
+            self.ok = False
+            return False
+
+        restart_limit = 100
+        conflicts = 0
+        try:
+            while True:
+                conflict = self.propagate()
+                if conflict is not None:
+                    if not self.trail_limits:
+                        self.ok = False
+                        return False
+                    conflicts += 1
+                    learnt, backjump = self.analyze(conflict)
+                    self.backtrack(backjump)
+                    if len(learnt) == 1:
+                        self.assign(learnt[0], None)
+                    else:
+                        self.assign(learnt[0], self.attach(learnt))
+                    continue
+
+                if conflicts >= restart_limit:
+                    conflicts = 0
+                    restart_limit = int(restart_limit * 1.5)
+                    self.backtrack(0)
+                    continue
+
+                # Assumptions are the first decisions.
+                level = len(self.trail_limits)
+                if level < len(assumptions):
+                    literal = assumptions[level]
+                    value = self.value(literal)
+                    if value is False:
+                        return False
+                    self.trail_limits.append(len(self.trail))
+                    if value is None:
+                        self.assign(literal, None)
+                    continue
+
+                v = self.pick_branch()
+                if v is None:
+                    self.model = self.values[:]
+                    return True
+                self.trail_limits.append(len(self.trail))
+                self.assign(v if self.phase[v] else -v, None)
+        finally:
+            self.backtrack(0)
+
+
+class Encoder():
+    """
+    Tseitin encoding of sentences into the clauses of a Solver. The resulting
+    CNF is equisatisfiable with the sentences rather than equivalent, as it
+    has extra variables for the compound subsentences.
+    """
+
+    def __init__(self, solver=None):
+        self.solver = solver or Solver()
+        # Symbol name -> variable, and sentence -> literal equivalent to it.
+        self.variables = {}
+        self.literals = {}
+
+    def add(self, sentence):
+        """
+        Asserts a sentence. Returns False if the clauses became unsatisfiable.
+        """
+        if isinstance(sentence, And):
+            return all([self.add(conjunct) for conjunct in sentence.conjuncts])
+        if isinstance(sentence, Or):
+            return self.solver.add_clause(
+                [self.literal(disjunct) for disjunct in sentence.disjuncts]
+            )
+        if isinstance(sentence, Implication):
+            return self.solver.add_clause(
+                [-self.literal(sentence.antecedent), self.literal(sentence.consequent)]
+            )
+        return self.solver.add_clause([self.literal(sentence)])
+
+    def literal(self, sentence):
+        """
+        Returns a literal that is true exactly when the sentence is, adding the
+        clauses defining it the first time the (sub)sentence is seen.
+        """
+        if isinstance(sentence, Symbol):
+            if sentence.name not in self.variables:
+                self.variables[sentence.name] = self.solver.new_variable()
+            return self.variables[sentence.name]
+        if isinstance(sentence, Not):
+            return -self.literal(sentence.operand)
+
+        if sentence in self.literals:
+            return self.literals[sentence]
+
+        add_clause = self.solver.add_clause
+        if isinstance(sentence, And):
+            parts = [self.literal(conjunct) for conjunct in sentence.conjuncts]
+            v = self.solver.new_variable()
+            # v => every conjunct, all conjuncts => v
+            for part in parts:
+                add_clause([-v, part])
+            add_clause([v] + [-part for part in parts])
+        elif isinstance(sentence, Or):
+            parts = [self.literal(disjunct) for disjunct in sentence.disjuncts]
+            v = self.solver.new_variable()
+            # v => some disjunct, every disjunct => v
+            add_clause([-v] + parts)
+            for part in parts:
+                add_clause([v, -part])
+        elif isinstance(sentence, Implication):
+            a = self.literal(sentence.antecedent)
+            c = self.literal(sentence.consequent)
+            v = self.solver.new_variable()
+            add_clause([-v, -a, c])
+            add_clause([v, a])
+            add_clause([v, -c])
+        elif isinstance(sentence, Biconditional):
+            a = self.literal(sentence.left)
+            b = self.literal(sentence.right)
+            v = self.solver.new_variable()
+            add_clause([-v, -a, b])
+            add_clause([-v, a, -b])
+            add_clause([v, a, b])
+            add_clause([v, -a, -b])
+        else:
+            raise TypeError("must be a logical sentence")
+
+        self.literals[sentence] = v
+        return v
+
+    def model(self):
+        """Returns the solver's last model as a dict of symbol names to values."""
+        return {name: bool(self.solver.model[v]) for name, v in self.variables.items()}
+
+
+def satisfiable(sentence):
+    """
+    Returns a model (a dict of symbol names to values) in which the sentence
+    is true, or None if there is none.
+    """
+    encoder = Encoder()
+    if encoder.add(sentence) and encoder.solver.solve():
+        return encoder.model()
+    return None
+
+
+def entails(knowledge, query):
+    """Checks if knowledge base entails query, as unsatisfiability of KB ∧ ¬query."""
+    encoder = Encoder()
+    if not encoder.add(knowledge):
+        return True
+    return not encoder.solver.solve([-encoder.literal(query)])
+
+
+class KnowledgeBase():
+    """
+    Knowledge base taking sentences incrementally, with one solver kept (along
+    with its learnt clauses) across all sentences and queries.
+    """
+
+    def __init__(self, *sentences):
+        self.knowledge = And()
+        self.encoder = Encoder()
+        # Query sentence -> whether the knowledge base entails it.
+        self.results = {}
+        for sentence in sentences:
+            self.add(sentence)
+
+    def add(self, sentence):
+        Sentence.validate(sentence)
+        self.knowledge.add(sentence)
+        self.encoder.add(sentence)
+
+        # Entailment is monotonic: what was entailed still is, but queries that
+        # were not entailed may be now.
+        self.results = {query: result for query, result in self.results.items() if result}
+
+    def entails(self, query):
+        """Checks if the knowledge base entails query."""
+        Sentence.validate(query)
+        if query not in self.results:
+            solver = self.encoder.solver
+            self.results[query] = (
+                not solver.ok or not solver.solve([-self.encoder.literal(query)])
+            )
+        return self.results[query]
+
+    def consistent(self):
+        """Checks if the knowledge base is satisfiable."""
+        return self.encoder.solver.solve()
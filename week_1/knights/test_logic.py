@@ -0,0 +1,129 @@
+import itertools
+import pickle
+import random
+import time
+
+from logic import *
+
+
+def random_sentence(rng, symbols, depth):
+    if depth == 0 or rng.random() < 0.2:
+        return rng.choice(symbols)
+    kind = rng.randrange(5)
+    if kind == 0:
+        return Not(random_sentence(rng, symbols, depth - 1))
+    if kind == 1:
+        return And(*[random_sentence(rng, symbols, depth - 1)
+                     for _ in range(rng.randint(1, 3))])
+    if kind == 2:
+        return Or(*[random_sentence(rng, symbols, depth - 1)
+                    for _ in range(rng.randint(1, 3))])
+    if kind == 3:
+        return Implication(random_sentence(rng, symbols, depth - 1),
+                           random_sentence(rng, symbols, depth - 1))
+    return Biconditional(random_sentence(rng, symbols, depth - 1),
+                         random_sentence(rng, symbols, depth - 1))
+
+
+def random_cases(count, seed=0):
+    """Yields (knowledge, query) pairs of random sentences."""
+    rng = random.Random(seed)
+    for _ in range(count):
+        symbols = [Symbol(f"s{i}") for i in range(rng.randint(1, 6))]
+        knowledge = And(*[random_sentence(rng, symbols, 3)
+                          for _ in range(rng.randint(1, 4))])
+        yield knowledge, random_sentence(rng, symbols, 2)
+
+
+def enumerate_entails(knowledge, query):
+    """Entailment by evaluating the sentences in every model."""
+    symbols = sorted(knowledge.symbols() | query.symbols())
+    for values in itertools.product((True, False), repeat=len(symbols)):
+        model = dict(zip(symbols, values))
+        if knowledge.evaluate(model) and not query.evaluate(model):
+            return False
+    return True
+
+
+def test_compile_matches_evaluate():
+    for knowledge, query in random_cases(200):
+        symbols = sorted(knowledge.symbols() | query.symbols())
+        index = {symbol: i for i, symbol in enumerate(symbols)}
+        compiled = knowledge.compile(index)
+        closure = knowledge.closure(index)
+        for values in itertools.product((True, False), repeat=len(symbols)):
+            expected = knowledge.evaluate(dict(zip(symbols, values)))
+            assert compiled(list(values)) == expected
+            assert closure(list(values)) == expected
+
+
+def test_model_check_matches_enumeration():
+    for knowledge, query in random_cases(300):
+        assert model_check(knowledge, query) == enumerate_entails(knowledge, query)
+
+
+def test_model_check_deeply_nested():
+    # Too deeply nested to compile as one Python expression.
+    sentence = Symbol("s")
+    for _ in range(150):
+        sentence = Not(Or(sentence, Symbol("b")))
+    assert model_check(sentence, sentence)
+    for query in (Symbol("s"), Symbol("b"), Not(Symbol("b"))):
+        assert model_check(sentence, query) == enumerate_entails(sentence, query)
+
+
+def test_model_check_vectorized():
+    for knowledge, query in random_cases(200):
+        expected = model_check(knowledge, query)
+        assert model_check_vectorized(knowledge, query) == expected
+        assert model_check_vectorized(knowledge, query, chunk_symbols=1) == expected
+
+
+def test_model_check_parallel():
+    for knowledge, query in random_cases(30, seed=4):
+        expected = model_check(knowledge, query)
+        for workers, split_symbols in ((1, 1), (2, 2), (2, 3)):
+            assert model_check_parallel(knowledge, query, workers, split_symbols) == expected
+
+
+def test_model_check_parallel_stops_early():
+    # The first subtree has a counterexample right away, while checking any of
+    # the others to the end would take minutes: the workers must be stopped.
+    symbols = [Symbol(f"s{i:02d}") for i in range(26)]
+    knowledge = And(*[Or(symbol, Not(symbol)) for symbol in symbols])
+    query = Not(symbols[-2])
+
+    start = time.perf_counter()
+    assert not model_check_parallel(knowledge, query, workers=2, split_symbols=2)
+    assert time.perf_counter() - start < 10
+
+
+def test_equal_sentences_are_shared():
+    a, b = Symbol("a"), Symbol("b")
+    assert Symbol("a") is a
+    assert Not(a) is Not(Symbol("a"))
+    assert Or(a, Not(b)) is Or(a, Not(b))
+    assert Implication(a, b) is Implication(a, b)
+    assert Biconditional(a, b) is Biconditional(a, b)
+    assert And(a, b) == And(a, b) and hash(And(a, b)) == hash(And(a, b))
+
+
+def test_extending_a_nested_and():
+    a, b = Symbol("a"), Symbol("b")
+    knowledge = And(a)
+    query = Not(knowledge)
+    outer = And(knowledge, Or(query, b))
+    knowledge.add(b)
+
+    assert query == Not(And(a, b))
+    assert hash(query) == hash(Not(And(a, b)))
+    assert query.symbols() == {"a", "b"}
+    assert hash(outer) == hash(And(And(a, b), Or(Not(And(a, b)), b)))
+    assert not model_check(a, query)
+
+
+def test_pickled_sentences_are_shared():
+    a, b = Symbol("a"), Symbol("b")
+    sentence = Biconditional(a, Or(Not(b), Implication(a, b)))
+    copy = pickle.loads(pickle.dumps(And(sentence, b)))
+    assert copy.conjuncts[0] is sentence
@@ -0,0 +1,66 @@
+from logic import *
+from sat import KnowledgeBase, entails, satisfiable
+from test_logic import random_cases
+
+a, b, c = Symbol("a"), Symbol("b"), Symbol("c")
+
+
+def test_entails_matches_model_check():
+    for knowledge, query in random_cases(1000, seed=1):
+        assert entails(knowledge, query) == model_check(knowledge, query)
+
+
+def test_knowledge_base_matches_model_check():
+    for knowledge, query in random_cases(300, seed=2):
+        knowledge_base = KnowledgeBase()
+        queries = [query, *knowledge.conjuncts]
+        for conjunct in knowledge.conjuncts:
+            knowledge_base.add(conjunct)
+            so_far = And(*knowledge_base.knowledge.conjuncts)
+            for query in queries:
+                # Twice, the second answer comes from the memo.
+                assert knowledge_base.entails(query) == model_check(so_far, query)
+                assert knowledge_base.entails(query) == model_check(so_far, query)
+
+
+def test_satisfiable_models():
+    for knowledge, _ in random_cases(300, seed=3):
+        model = satisfiable(knowledge)
+        if model is None:
+            assert model_check(knowledge, And(a, Not(a)))
+        else:
+            assert knowledge.evaluate(model)
+
+
+def test_empty_sentences():
+    # An empty And is true, an empty Or is false.
+    assert entails(And(), And())
+    assert not entails(And(), Or())
+    assert not entails(And(), a)
+    assert entails(Or(), a)
+    assert entails(a, And())
+    assert not entails(a, Or())
+    assert satisfiable(And()) == {}
+    assert satisfiable(Or()) is None
+
+
+def test_tautologies():
+    for query in (Or(a, Not(a)), Implication(a, a), Biconditional(b, b),
+                  Implication(And(a, b), a)):
+        assert entails(And(), query)
+        assert entails(c, query)
+        assert KnowledgeBase().entails(query)
+
+
+def test_inconsistent_knowledge_base():
+    knowledge_base = KnowledgeBase(a, Implication(a, b))
+    assert knowledge_base.consistent()
+    assert knowledge_base.entails(b)
+    assert not knowledge_base.entails(c)
+
+    knowledge_base.add(Not(b))
+    assert not knowledge_base.consistent()
+    # Everything follows from a contradiction.
+    for query in (b, Not(b), c, Or()):
+        assert knowledge_base.entails(query)
+        assert model_check(knowledge_base.knowledge, query)